@@ -3,5 +3,22 @@ Biblioteca de metaheurísticas para el problema CARP (Capacitated Arc Routing Pr
 """
 
 from .modelo import CarpLib
+from .busqueda_local import BusquedaLocal
+from .banco_soluciones import BancoSoluciones
+from .cache_rutas import CacheRutas
+from .evaluacion import EvaluadorRutas, backends_disponibles, depositos_de
+from .recocido import RecocidoSimulado
+from .seleccion_operadores import SelectorOperadores
+from .paralelo import resolver_paralelo
+from .generador import generar_instancia, escribir_dat
+from .escalabilidad import escalabilidad
+from .registro import RegistroConvergencia, cargar_registro, tabla_comparativa
+from .puntos_control import guardar_punto_control, cargar_punto_control
 
-__all__ = ['CarpLib']
+__all__ = ['CarpLib', 'BusquedaLocal', 'CacheRutas', 'EvaluadorRutas', 'backends_disponibles',
+           'depositos_de',
+           'BancoSoluciones', 'RecocidoSimulado', 'SelectorOperadores',
+           'resolver_paralelo',
+           'RegistroConvergencia', 'cargar_registro', 'tabla_comparativa',
+           'guardar_punto_control', 'cargar_punto_control',
+           'generar_instancia', 'escribir_dat', 'escalabilidad']
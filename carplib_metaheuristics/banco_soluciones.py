@@ -0,0 +1,214 @@
+"""
+Banco (pool) de soluciones para métodos poblacionales y de reinicio.
+
+Cada solución se guarda de forma compacta como un arreglo int32 con sus rutas separadas
+por ceros, junto con su costo. Para rechazar duplicados se usa una huella canónica: se
+descartan las rutas vacías, cada ruta se toma en el sentido lexicográficamente menor
+(si se ignora el sentido) y las rutas se ordenan, así que dos soluciones que solo
+difieren en el orden de las rutas o en el sentido de recorrido tienen la misma huella.
+
+La distancia entre soluciones es la de pares rotos (broken pairs): cuántos pares de
+tareas consecutivas (contando el depósito como tarea 0 al inicio y final de cada ruta)
+de una solución no aparecen en la otra, sin importar el sentido. Cada solución se
+representa por el arreglo ordenado de los códigos de sus pares, de modo que la
+distancia de una solución a todo el banco es una consulta vectorizada de los códigos
+concatenados del banco contra los de la solución.
+"""
+
+import hashlib
+
+import numpy as np
+
+# Tamaño máximo de la tabla de marcas por código de par (bytes); con más tareas se usa
+# búsqueda binaria sobre los códigos de la solución consultada
+MAX_MARCAS = 64 * 2**20
+
+
+class BancoSoluciones:
+    """
+    Conjunto acotado de soluciones distintas con su costo.
+
+    capacidad: tamaño máximo; lleno, una solución nueva sustituye a la peor si la mejora.
+    distancia_minima: si es > 0, una solución a menos de esa distancia de otra del banco
+        solo entra sustituyéndola, y solo si tiene menor costo.
+    ignorar_sentido: una ruta y su inversa se consideran la misma ruta. En CarpLib el
+        costo de una ruta invertida puede diferir (cada tarea se entra por su extremo
+        más cercano), así que se conserva la primera que se agrega.
+    """
+
+    def __init__(self, carp, capacidad=1000, distancia_minima=0, ignorar_sentido=True):
+        self.n_tareas = len(carp.datos['LISTA_ARISTAS_REQ'])
+        self.n_rutas = carp.datos['VEHICULOS']
+        self.capacidad = capacidad
+        self.distancia_minima = distancia_minima
+        self.ignorar_sentido = ignorar_sentido
+
+        self._rutas = []      # int32: rutas de la solución separadas por 0
+        self._pares = []      # int64: códigos de pares ordenados
+        self._costos = []
+        self._huellas = {}    # huella -> índice en el banco
+        self._indices = []    # índice -> huella
+        self._concatenado = None
+        n_codigos = 2 * (self.n_tareas + 1) ** 2
+        self._marcas = np.zeros(n_codigos, dtype=bool) if n_codigos <= MAX_MARCAS else None
+        self.rechazados_duplicado = 0
+        self.rechazados_distancia = 0
+
+    def __len__(self):
+        return len(self._costos)
+
+    # --- Representación ---
+    def _compactar(self, solucion):
+        rutas = [r for r in solucion if r]
+        largo = sum(len(r) for r in rutas) + len(rutas) + 1
+        plano = np.zeros(largo, dtype=np.int32)
+        pos = 1
+        for r in rutas:
+            plano[pos:pos + len(r)] = r
+            pos += len(r) + 1
+        return plano
+
+    def huella(self, solucion):
+        """Huella canónica de 16 bytes (independiente del orden y, opcionalmente, del sentido)."""
+        rutas = [tuple(r) for r in solucion if r]
+        if self.ignorar_sentido:
+            rutas = [min(r, r[::-1]) for r in rutas]
+        rutas.sort()
+        plano = self._compactar(rutas)
+        return hashlib.blake2b(plano.tobytes(), digest_size=16).digest()
+
+    def _codigos_pares(self, plano):
+        """Códigos ordenados de los pares consecutivos (sin sentido) de una solución compacta."""
+        a, b = plano[:-1].astype(np.int64), plano[1:].astype(np.int64)
+        validos = (a != 0) | (b != 0)  # 0,0 solo aparece con soluciones vacías
+        a, b = a[validos], b[validos]
+        codigos = np.sort(np.minimum(a, b) * (self.n_tareas + 1) + np.maximum(a, b))
+        # Un par puede repetirse (ruta de una sola tarea: 0-t y t-0); la segunda
+        # aparición recibe otro código para contar los pares como multiconjunto
+        repetido = np.zeros(len(codigos), dtype=np.int64)
+        repetido[1:] = codigos[1:] == codigos[:-1]
+        return codigos * 2 + repetido
+
+    # --- Distancias ---
+    def _todos_los_pares(self):
+        if self._concatenado is None:
+            largos = np.fromiter(map(len, self._pares), dtype=np.int64, count=len(self._pares))
+            codigos = np.concatenate(self._pares) if self._pares else np.empty(0, dtype=np.int64)
+            self._concatenado = (codigos, np.repeat(np.arange(len(self._pares)), largos), largos)
+        return self._concatenado
+
+    def _distancias_pares(self, pares):
+        codigos, duenos, largos = self._todos_los_pares()
+        if len(codigos) == 0 or len(pares) == 0:
+            return np.maximum(largos, len(pares))
+        if self._marcas is not None:
+            # Tabla de marcas indexada por código: una lectura por código del banco
+            self._marcas[pares] = True
+            en_comun = self._marcas[codigos]
+            self._marcas[pares] = False
+        else:
+            pos = np.minimum(np.searchsorted(pares, codigos), len(pares) - 1)
+            en_comun = pares[pos] == codigos
+        comunes = np.bincount(duenos, weights=en_comun, minlength=len(self._pares))
+        return np.maximum(largos, len(pares)) - comunes.astype(np.int64)
+
+    def distancias(self, solucion):
+        """Distancia de pares rotos de `solucion` a cada solución del banco (arreglo)."""
+        return self._distancias_pares(self._codigos_pares(self._compactar(solucion)))
+
+    def distancia(self, sol_a, sol_b):
+        pa = self._codigos_pares(self._compactar(sol_a))
+        pb = self._codigos_pares(self._compactar(sol_b))
+        return int(max(len(pa), len(pb)) - np.isin(pa, pb, assume_unique=True).sum())
+
+    def diversidad(self):
+        """
+        Distancia media entre pares de soluciones del banco. No se calculan las n² distancias:
+        la suma de pares comunes es Σ c·(c−1) sobre el número c de soluciones que comparten
+        cada código, y la de max(|A|, |B|) sale de ordenar los tamaños.
+        """
+        n = len(self)
+        if n < 2:
+            return 0.0
+        codigos, _, largos = self._todos_los_pares()
+        _, veces = np.unique(codigos, return_counts=True)
+        comunes = int((veces * (veces - 1)).sum())
+        largos = np.sort(largos)
+        maximos = int((2 * np.arange(n) * largos).sum())
+        return (maximos - comunes) / (n * (n - 1))
+
+    # --- Gestión ---
+    def contiene(self, solucion):
+        return self.huella(solucion) in self._huellas
+
+    def agregar(self, solucion, costo):
+        """Intenta agregar la solución; retorna True si entró en el banco."""
+        huella = self.huella(solucion)
+        if huella in self._huellas:
+            self.rechazados_duplicado += 1
+            return False
+        plano = self._compactar(solucion)
+        pares = self._codigos_pares(plano)
+
+        if self.distancia_minima > 0 and len(self):
+            d = self._distancias_pares(pares)
+            cercano = int(np.argmin(d))
+            if d[cercano] < self.distancia_minima:
+                if costo >= self._costos[cercano]:
+                    self.rechazados_distancia += 1
+                    return False
+                self._colocar(cercano, huella, plano, pares, costo)
+                return True
+
+        if len(self) < self.capacidad:
+            self._colocar(len(self), huella, plano, pares, costo)
+            return True
+        peor = int(np.argmax(self._costos))
+        if costo >= self._costos[peor]:
+            return False
+        self._colocar(peor, huella, plano, pares, costo)
+        return True
+
+    def _colocar(self, i, huella, plano, pares, costo):
+        if i == len(self):
+            self._rutas.append(plano); self._pares.append(pares)
+            self._costos.append(costo); self._indices.append(huella)
+        else:
+            del self._huellas[self._indices[i]]
+            self._rutas[i], self._pares[i], self._costos[i], self._indices[i] = plano, pares, costo, huella
+        self._huellas[huella] = i
+        self._concatenado = None
+
+    # --- Consulta ---
+    def solucion(self, i):
+        """Reconstruye la solución i (lista de rutas, con rutas vacías hasta VEHICULOS)."""
+        plano = self._rutas[i]
+        cortes = np.flatnonzero(plano == 0)
+        rutas = [plano[a + 1:b].tolist() for a, b in zip(cortes[:-1], cortes[1:])]
+        return rutas + [[] for _ in range(self.n_rutas - len(rutas))]
+
+    def costo(self, i):
+        return self._costos[i]
+
+    def mejor(self):
+        """(solución, costo) de menor costo, o (None, inf) si el banco está vacío."""
+        if not self._costos:
+            return None, float('inf')
+        i = int(np.argmin(self._costos))
+        return self.solucion(i), self._costos[i]
+
+    def soluciones(self):
+        """Lista de (solución, costo) ordenada por costo."""
+        orden = np.argsort(self._costos, kind="stable")
+        return [(self.solucion(i), self._costos[i]) for i in orden.tolist()]
+
+    def estadisticas(self):
+        costos = np.asarray(self._costos, dtype=float)
+        return {
+            'soluciones': len(self),
+            'capacidad': self.capacidad,
+            'costo_min': float(costos.min()) if len(costos) else float('inf'),
+            'costo_medio': float(costos.mean()) if len(costos) else float('inf'),
+            'rechazados_duplicado': self.rechazados_duplicado,
+            'rechazados_distancia': self.rechazados_distancia,
+        }
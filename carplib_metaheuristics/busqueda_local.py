@@ -0,0 +1,408 @@
+"""
+Búsqueda local sistemática (mejor / primera mejora) sobre los vecindarios de CarpLib:
+ - insertion : reubicar una tarea en otra posición (misma ruta u otra ruta)
+ - swap      : intercambiar dos tareas (misma ruta u otra ruta)
+ - inversion : invertir un segmento de una ruta (2-opt intra-ruta)
+"""
+
+from collections import deque
+
+import numpy as np
+
+from .evaluacion import depositos_de
+
+VECINDARIOS = ("insertion", "swap", "inversion")
+
+# Arreglos globales por posición de tarea (P) y por hueco de inserción (G): cada ruta
+# ocupa en ellos un tramo contiguo que empieza en _base[r] (P) o _gbase[r] (G)
+_CAMPOS_P = ("_Pt", "_Pa", "_Pb", "_Pe", "_Ps", "_Pr", "_Pi", "_PU", "_PV", "_PC", "_PDEM", "_Pslot")
+_CAMPOS_G = ("_Ga", "_Gb", "_Gr", "_Gk", "_Gdd")
+
+
+class BusquedaLocal:
+    """
+    Descenso hasta óptimo local sobre soluciones de CarpLib (lista de rutas con IDs de tarea).
+
+    Cada tarea conserva la orientación (nodo de entrada y de salida) que le asigna la
+    evaluación de CarpLib. Con esas orientaciones fijas y la carga acumulada de cada ruta,
+    el costo de cualquier movimiento se evalúa en O(1); los vecinos de una tarea se
+    evalúan todos a la vez con NumPy. Al aplicar un movimiento se recorren de nuevo solo
+    las rutas afectadas y, si el costo real no mejora, el movimiento se deshace.
+
+    Los bits "no mirar" (don't-look bits) duermen las tareas sin movimiento de mejora;
+    solo se despiertan las tareas de las rutas que cambian.
+
+    Con penalizacion=λ los movimientos que exceden la capacidad no se descartan: se
+    minimiza costo + λ·exceso de carga, con el cambio de exceso también en O(1).
+
+    Con varios depósitos cada ruta usa el depósito que le asigna la evaluación de CarpLib
+    (las rutas vacías se reparten entre los depósitos). Con DURACION_MAXIMA el costo de
+    cada ruta se trata como la carga: los movimientos inter-ruta que dejan una ruta por
+    encima del límite se descartan (o se penalizan con el mismo λ). Con flota abierta se
+    añaden rutas vacías para poder abrir rutas nuevas.
+    """
+
+    def __init__(self, carp, vecindarios=VECINDARIOS, estrategia="best", eps=1e-9, penalizacion=None):
+        if estrategia not in ("best", "first"):
+            raise ValueError(f"Estrategia desconocida: {estrategia}")
+        for nombre in vecindarios:
+            if nombre not in VECINDARIOS:
+                raise ValueError(f"Vecindario desconocido: {nombre}")
+
+        datos = carp.datos
+        lista = datos['LISTA_ARISTAS_REQ']
+        self.carp = carp
+        self.depositos = depositos_de(datos)
+        self.dep = self.depositos[0]
+        self.cap_max, self.dur_max, self.flota_abierta = carp.limites()
+        self.vecindarios = tuple(vecindarios)
+        self.estrategia = estrategia
+        self.eps = eps
+        self.penalizacion = penalizacion
+
+        # Datos por tarea indexados por ID (posición 0 sin uso)
+        self.U = np.array([0] + [it['arco'][0] for it in lista], dtype=np.int64)
+        self.V = np.array([0] + [it['arco'][1] for it in lista], dtype=np.int64)
+        self.C = np.array([0] + [it['coste'] for it in lista], dtype=float)
+        self.DEM = np.array([0] + [it['demanda'] for it in lista], dtype=np.int64)
+        self._u, self._v = self.U.tolist(), self.V.tolist()
+        self._c, self._dem = self.C.tolist(), self.DEM.tolist()
+
+        # Matriz sin inf (las diferencias no dan nan), compartida por todas las búsquedas
+        # de la instancia: D para NumPy y _D, plana, para consultas sueltas
+        self.D, self._D = carp.matriz_finita()
+        self._n = self.D.shape[1]
+
+        self.rutas = []
+        self.estadisticas = {'evaluaciones': 0, 'movimientos': 0, 'rechazados': 0}
+
+    # ------------------------------------------------------------------
+    # Estado por ruta
+    # ------------------------------------------------------------------
+    def _recorrer(self, ruta, dep=None):
+        """
+        Recorre la ruta como calcular_costo_y_factibilidad: (entradas, salidas, costo,
+        carga, depósito). Una ruta vacía conserva `dep`.
+        """
+        D, n = self._D, self._n
+        if len(self.depositos) > 1 and ruta:
+            dep = self.carp._evaluador_actual().deposito_de_ruta(ruta)
+        elif dep is None:
+            dep = self.dep
+        pos = dep
+        ini, fin = [], []
+        costo, carga = 0.0, 0
+        for t in ruta:
+            u, v = self._u[t], self._v[t]
+            fila = pos * n
+            d_u, d_v = D[fila + u], D[fila + v]
+            if d_u <= d_v:
+                ini.append(u); fin.append(v); costo += d_u
+            else:
+                ini.append(v); fin.append(u); costo += d_v
+            costo += self._c[t]
+            carga += self._dem[t]
+            pos = fin[-1]
+        costo += D[pos * n + dep]
+        return ini, fin, costo, carga, dep
+
+    def _indexar_ruta(self, r):
+        """Arreglos de posiciones y huecos de inserción de la ruta r (ver _CAMPOS_P y _CAMPOS_G)."""
+        dep = self._dep[r]
+        ruta, ini, fin = self.rutas[r], self._ini[r], self._fin[r]
+        n = len(ruta)
+        salidas = [dep] + fin          # nodo previo a cada hueco
+        entradas = ini + [dep]         # nodo siguiente a cada hueco
+        Pt = np.array(ruta, dtype=np.int64)
+        Pa = np.array(salidas[:n], dtype=np.int64)
+        Pb = np.array(entradas[1:], dtype=np.int64)
+        Pe = np.array(ini, dtype=np.int64)
+        Ps = np.array(fin, dtype=np.int64)
+        Ga = np.array(salidas, dtype=np.int64)
+        Gb = np.array(entradas, dtype=np.int64)
+        PC = self.C[Pt]
+        self._bloques[r] = (
+            (Pt, Pa, Pb, Pe, Ps, np.full(n, r, dtype=np.int64), np.arange(n), self.U[Pt], self.V[Pt],
+             PC, self.DEM[Pt], self.D[Pa, Pe] + PC + self.D[Ps, Pb]),
+            (Ga, Gb, np.full(n + 1, r, dtype=np.int64), np.arange(n + 1), self.D[Ga, Gb]),
+        )
+
+    def _indexar(self):
+        """Une los arreglos de todas las rutas en los arreglos globales de la solución."""
+        P = [[] for _ in _CAMPOS_P]
+        G = [[] for _ in _CAMPOS_G]
+        self._base = np.zeros(len(self._bloques), dtype=np.int64)
+        self._gbase = np.zeros(len(self._bloques), dtype=np.int64)
+        total, total_g, huecos_vacios = 0, 0, set()
+        for r, (bloque_p, bloque_g) in enumerate(self._bloques):
+            self._base[r], self._gbase[r] = total, total_g
+            n = len(bloque_p[0])
+            if n == 0:
+                # Las rutas vacías de un mismo depósito son equivalentes: basta con un hueco
+                if self._dep[r] in huecos_vacios:
+                    continue
+                huecos_vacios.add(self._dep[r])
+            for lista, arr in zip(P, bloque_p):
+                lista.append(arr)
+            for lista, arr in zip(G, bloque_g):
+                lista.append(arr)
+            total += n
+            total_g += n + 1
+
+        for campo, lista in zip(_CAMPOS_P + _CAMPOS_G, P + G):
+            setattr(self, campo, np.concatenate(lista))
+        self._largos = [len(bloque_p[0]) for bloque_p, _ in self._bloques]
+        self._cargas = np.array(self._carga, dtype=np.int64)
+        self._costos = np.array(self._costo, dtype=float)
+        self._pos = {t: (r, i) for r, ruta in enumerate(self.rutas) for i, t in enumerate(ruta)}
+
+    def _reindexar(self, afectadas):
+        """
+        Actualiza los arreglos globales tras cambiar las rutas `afectadas`: solo se
+        reemplazan sus tramos y se desplazan los inicios de las rutas siguientes. Si alguna
+        ruta se vacía o deja de estar vacía cambian los huecos de las rutas vacías y se
+        vuelve a indexar todo.
+        """
+        for r in afectadas:
+            self._indexar_ruta(r)
+        if any((len(self.rutas[r]) == 0) != (self._largos[r] == 0) for r in afectadas):
+            self._indexar()
+            return
+        # De la última ruta a la primera, para que los inicios de las anteriores sigan valiendo
+        for r in sorted(afectadas, reverse=True):
+            n, n_antes = len(self.rutas[r]), self._largos[r]
+            tramos = ((_CAMPOS_P, self._bloques[r][0], self._base[r], n_antes),
+                      (_CAMPOS_G, self._bloques[r][1], self._gbase[r], n_antes + 1))
+            for campos, bloque, ini, largo in tramos:
+                for campo, arr in zip(campos, bloque):
+                    global_ = getattr(self, campo)
+                    if n == n_antes:
+                        global_[ini:ini + largo] = arr
+                    else:
+                        setattr(self, campo, np.concatenate((global_[:ini], arr, global_[ini + largo:])))
+            if n != n_antes:
+                self._base[r + 1:] += n - n_antes
+                self._gbase[r + 1:] += n - n_antes
+                self._largos[r] = n
+            self._cargas[r] = self._carga[r]
+            self._costos[r] = self._costo[r]
+            for i, t in enumerate(self.rutas[r]):
+                self._pos[t] = (r, i)
+
+    # ------------------------------------------------------------------
+    # Evaluación de vecindarios (todos los vecinos de una tarea a la vez)
+    # ------------------------------------------------------------------
+    def _mejor_insercion(self, p, r, i, u, v, c, d, ganancia_quitar):
+        D = self.D
+        Ga, Gb, Gr, Gk = self._Ga, self._Gb, self._Gr, self._Gk
+        entra = np.minimum(D[Ga, u] + D[v, Gb], D[Ga, v] + D[u, Gb]) + c - self._Gdd
+        delta = entra - ganancia_quitar
+        misma = Gr == r
+        delta[misma & ((Gk == i) | (Gk == i + 1))] = np.inf
+        cargas, costos = self._cargas, self._costos
+        otra = ~misma
+        if self.penalizacion is None:
+            delta[otra & (cargas[Gr] + d > self.cap_max)] = np.inf
+            if self.dur_max != np.inf:
+                delta[otra & (costos[Gr] + entra > self.dur_max)] = np.inf
+        else:
+            delta[otra] += self.penalizacion * (
+                self._delta_exceso(cargas[r], -d) + self._delta_exceso(cargas[Gr[otra]], d))
+            if self.dur_max != np.inf:
+                delta[otra] += self.penalizacion * (
+                    self._delta_exceso(costos[r], -ganancia_quitar, self.dur_max)
+                    + self._delta_exceso(costos[Gr[otra]], entra[otra], self.dur_max))
+        g = int(np.argmin(delta))
+        return float(delta[g]), ("insertion", r, i, int(Gr[g]), int(Gk[g]))
+
+    def _mejor_swap(self, p, r, i, u, v, c, d, slot):
+        D = self.D
+        a0, b0 = self._Pa[p], self._Pb[p]
+        Pa, Pb, Pr, Pi = self._Pa, self._Pb, self._Pr, self._Pi
+        PU, PV = self._PU, self._PV
+        otra_aqui = np.minimum(D[a0, PU] + D[PV, b0], D[a0, PV] + D[PU, b0]) + self._PC
+        esta_alla = np.minimum(D[Pa, u] + D[v, Pb], D[Pa, v] + D[u, Pb]) + c
+        delta = otra_aqui + esta_alla - slot - self._Pslot
+        misma = Pr == r
+        delta[misma & (np.abs(Pi - i) <= 1)] = np.inf
+        cargas, dem2, costos = self._cargas, self._PDEM, self._costos
+        con_duracion = self.dur_max != np.inf
+        if con_duracion:
+            aqui, alla = otra_aqui - slot, esta_alla - self._Pslot  # cambio de costo de cada ruta
+        if self.penalizacion is None:
+            excede = (cargas[r] - d + dem2 > self.cap_max) | (cargas[Pr] - dem2 + d > self.cap_max)
+            if con_duracion:
+                excede |= (costos[r] + aqui > self.dur_max) & (aqui > 0)
+                excede |= (costos[Pr] + alla > self.dur_max) & (alla > 0)
+            delta[~misma & excede] = np.inf
+        else:
+            otra = ~misma
+            delta[otra] += self.penalizacion * (self._delta_exceso(cargas[r], dem2[otra] - d)
+                                                + self._delta_exceso(cargas[Pr[otra]], d - dem2[otra]))
+            if con_duracion:
+                delta[otra] += self.penalizacion * (
+                    self._delta_exceso(costos[r], aqui[otra], self.dur_max)
+                    + self._delta_exceso(costos[Pr[otra]], alla[otra], self.dur_max))
+        q = int(np.argmin(delta))
+        mejor, mov = float(delta[q]), ("swap", r, i, int(Pr[q]), int(Pi[q]))
+
+        # Tareas adyacentes en la misma ruta: comparten un tramo y se evalúan aparte
+        n = len(self.rutas[r])
+        for j in (i - 1, i + 1):
+            if 0 <= j < n:
+                delta_adj = self._delta_swap_adyacente(self._base[r] + min(i, j))
+                if delta_adj < mejor:
+                    mejor, mov = delta_adj, ("swap", r, min(i, j), r, max(i, j))
+        return mejor, mov
+
+    def _delta_exceso(self, carga, cambio, limite=None):
+        """
+        Variación del exceso de carga de una ruta (o arreglo de rutas) al sumar `cambio`;
+        con `limite` el exceso es sobre ese límite (p. ej. costo sobre la duración máxima).
+        """
+        Q = self.cap_max if limite is None else limite
+        return np.maximum(carga + cambio - Q, 0) - np.maximum(carga - Q, 0)
+
+    def _valor(self, costo, carga):
+        if self.penalizacion is None:
+            return costo
+        exceso = max(0, carga - self.cap_max)
+        if self.dur_max != np.inf:
+            exceso += max(0, costo - self.dur_max)
+        return costo + self.penalizacion * exceso
+
+    def _excede_duracion(self, afectadas, nuevos):
+        """Sin penalización: alguna ruta afectada sube de costo por encima de la duración máxima."""
+        return self.penalizacion is None and self.dur_max != np.inf and any(
+            nuevos[r][2] > self.dur_max and nuevos[r][2] > self._costo[r] for r in afectadas)
+
+    def _delta_swap_adyacente(self, p1):
+        D, n = self._D, self._n
+        p2 = p1 + 1
+        a, b = int(self._Pa[p1]) * n, int(self._Pb[p2])
+        t1, t2 = self._Pt[p1], self._Pt[p2]
+        antes = self._Pslot[p1] + self._Pslot[p2] - D[int(self._Ps[p1]) * n + int(self._Pe[p2])]
+        ahora = np.inf
+        for x2, y2 in ((self._u[t2], self._v[t2]), (self._v[t2], self._u[t2])):
+            for x1, y1 in ((self._u[t1], self._v[t1]), (self._v[t1], self._u[t1])):
+                ahora = min(ahora, D[a + x2] + D[y2 * n + x1] + D[y1 * n + b])
+        return ahora + self._c[t1] + self._c[t2] - antes
+
+    def _mejor_inversion(self, p, r, i):
+        D = self.D
+        base, n = self._base[r], len(self.rutas[r])
+        a0, b0, e, s = self._Pa[p], self._Pb[p], self._Pe[p], self._Ps[p]
+        mejor, mov = np.inf, None
+        # Segmentos [i..j] con j > i: se entra por la salida de j y se sale por la entrada de i
+        if i + 1 < n:
+            fin_j, B = self._Ps[base + i + 1:base + n], self._Pb[base + i + 1:base + n]
+            delta = D[a0, fin_j] + D[e, B] - D[a0, e] - D[fin_j, B]
+            k = int(np.argmin(delta))
+            mejor, mov = float(delta[k]), ("inversion", r, i, i + 1 + k)
+        # Segmentos [k..i] con k < i
+        if i > 0:
+            ini_k, A = self._Pe[base:base + i], self._Pa[base:base + i]
+            delta = D[A, s] + D[ini_k, b0] - D[A, ini_k] - D[s, b0]
+            k = int(np.argmin(delta))
+            if delta[k] < mejor:
+                mejor, mov = float(delta[k]), ("inversion", r, k, i)
+        return mejor, mov
+
+    def _evaluar(self, p):
+        """Mejor movimiento (delta, movimiento) de la tarea en la posición p."""
+        self.estadisticas['evaluaciones'] += 1
+        t, r, i = int(self._Pt[p]), int(self._Pr[p]), int(self._Pi[p])
+        u, v, c, d = self._u[t], self._v[t], self._c[t], self._dem[t]
+        slot = self._Pslot[p]
+        mejor, mov = -self.eps, None
+        for nombre in self.vecindarios:
+            if nombre == "insertion":
+                ganancia = slot - self.D[self._Pa[p], self._Pb[p]]
+                delta, m = self._mejor_insercion(p, r, i, u, v, c, d, ganancia)
+            elif nombre == "swap":
+                delta, m = self._mejor_swap(p, r, i, u, v, c, d, slot)
+            else:
+                delta, m = self._mejor_inversion(p, r, i)
+            if m is not None and delta < mejor:
+                mejor, mov = delta, m
+                if self.estrategia == "first":
+                    break
+        return mejor, mov
+
+    # ------------------------------------------------------------------
+    # Aplicación de movimientos
+    # ------------------------------------------------------------------
+    def _aplicar(self, mov):
+        if mov[0] == "insertion":
+            _, r1, i, r2, k = mov
+            t = self.rutas[r1].pop(i)
+            if r1 == r2 and k > i:
+                k -= 1
+            self.rutas[r2].insert(k, t)
+        elif mov[0] == "swap":
+            _, r1, i, r2, j = mov
+            self.rutas[r1][i], self.rutas[r2][j] = self.rutas[r2][j], self.rutas[r1][i]
+        else:
+            _, r, i, j = mov
+            self.rutas[r][i:j + 1] = self.rutas[r][i:j + 1][::-1]
+
+    def ejecutar(self, solucion, max_movimientos=None):
+        """
+        Aplica movimientos de mejora hasta alcanzar un óptimo local (o max_movimientos).
+        Retorna una nueva solución; la solución de entrada no se modifica.
+        """
+        self.rutas = [list(r) for r in solucion]
+        n_rutas = len(self.rutas)
+        if self.flota_abierta:
+            # Una ruta vacía por depósito para poder abrir rutas nuevas
+            vacias = sum(1 for r in self.rutas if not r)
+            self.rutas.extend([] for _ in range(len(self.depositos) - vacias))
+        # Las rutas vacías se reparten entre los depósitos
+        vacias = [r for r, ruta in enumerate(self.rutas) if not ruta]
+        deps = {r: self.depositos[k % len(self.depositos)] for k, r in enumerate(vacias)}
+        estados = [self._recorrer(ruta, deps.get(r)) for r, ruta in enumerate(self.rutas)]
+        self._ini = [e[0] for e in estados]
+        self._fin = [e[1] for e in estados]
+        self._costo = [e[2] for e in estados]
+        self._carga = [e[3] for e in estados]
+        self._dep = [e[4] for e in estados]
+        self._bloques = [None] * len(self.rutas)
+        for r in range(len(self.rutas)):
+            self._indexar_ruta(r)
+        self._indexar()
+
+        cola = deque(t for ruta in self.rutas for t in ruta)
+        en_cola = set(cola)
+        while cola:
+            if max_movimientos is not None and self.estadisticas['movimientos'] >= max_movimientos:
+                break
+            t = cola.popleft()
+            en_cola.discard(t)
+            r, i = self._pos[t]
+            delta, mov = self._evaluar(self._base[r] + i)
+            if mov is None:
+                continue  # la tarea queda dormida hasta que cambie su ruta
+
+            afectadas = sorted({mov[1], mov[3]}) if mov[0] != "inversion" else [mov[1]]
+            respaldo = {r: list(self.rutas[r]) for r in afectadas}
+            self._aplicar(mov)
+            nuevos = {r: self._recorrer(self.rutas[r], self._dep[r]) for r in afectadas}
+            antes = sum(self._valor(self._costo[r], self._carga[r]) for r in afectadas)
+            if (sum(self._valor(nuevos[r][2], nuevos[r][3]) for r in afectadas) >= antes - self.eps
+                    or self._excede_duracion(afectadas, nuevos)):
+                # La reorientación de la ruta anuló la mejora estimada: se deshace
+                for r in afectadas:
+                    self.rutas[r] = respaldo[r]
+                self.estadisticas['rechazados'] += 1
+                continue
+
+            for r in afectadas:
+                self._ini[r], self._fin[r], self._costo[r], self._carga[r], self._dep[r] = nuevos[r]
+            self._reindexar(afectadas)
+            self.estadisticas['movimientos'] += 1
+            for r in afectadas:
+                for t2 in self.rutas[r]:
+                    if t2 not in en_cola:
+                        cola.append(t2); en_cola.add(t2)
+        # De las rutas añadidas por la flota abierta solo quedan las que se usaron
+        return [list(r) for r in self.rutas[:n_rutas]] + [list(r) for r in self.rutas[n_rutas:] if r]
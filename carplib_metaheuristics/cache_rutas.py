@@ -0,0 +1,54 @@
+"""
+Caché LRU acotada de evaluaciones de ruta, indexada por el contenido de la ruta.
+"""
+
+from collections import OrderedDict
+
+
+class CacheRutas:
+    """
+    Guarda la evaluación de cada ruta con la tupla de sus tareas como clave. El costo de
+    una ruta solo depende de esa secuencia (y de la instancia cargada), así que tras un
+    movimiento las rutas que no cambian se resuelven sin recorrerlas.
+    Al superar `capacidad` entradas se descarta la usada hace más tiempo.
+    """
+
+    def __init__(self, capacidad=50000):
+        self.capacidad = capacidad
+        self._datos = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        valor = self._datos.get(clave)
+        if valor is None:
+            self.fallos += 1
+            return None
+        self._datos.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        self._datos[clave] = valor
+        self._datos.move_to_end(clave)
+        if len(self._datos) > self.capacidad:
+            self._datos.popitem(last=False)
+
+    def limpiar(self):
+        """Vacía la caché (p. ej. al cargar otra instancia) y reinicia los contadores."""
+        self._datos.clear()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._datos),
+            'capacidad': self.capacidad,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+        }
@@ -0,0 +1,419 @@
+"""
+Heurísticas constructivas para soluciones iniciales completas y factibles:
+ - path_scanning : Golden, DeArmon y Baker (1983), con sus cinco reglas de desempate
+ - augment_merge : Golden y Wong (1981), fase de aumento más fusión por ahorros
+ - grasp         : path-scanning aleatorizado con lista restringida de candidatos
+
+Con varios depósitos cada ruta de path-scanning sale del depósito más cercano a las
+tareas pendientes y las distancias "al depósito" de las reglas son al más cercano. Con
+DURACION_MAXIMA path-scanning solo toma tareas que dejan volver a tiempo y las fusiones
+de augment-merge respetan el límite.
+
+Sin flota abierta, si una heurística necesita más rutas que VEHICULOS se repara la
+solución (_ajustar_flota): se unen rutas aunque empeore el costo, se reparten las tareas
+de las rutas sobrantes por inserción más barata y, en último caso, se reconstruyen las
+rutas menos cargadas con path-scanning. Si aun así sobran rutas se lanza ValueError en
+lugar de devolver una solución que no cabe en la flota.
+"""
+
+import random
+
+import numpy as np
+
+from .evaluacion import depositos_de
+
+REGLAS = (1, 2, 3, 4, 5)
+
+_EPS = 1e-9
+
+
+class _Tareas:
+    """Arreglos NumPy de las tareas alcanzables de la instancia cargada en CarpLib."""
+
+    def __init__(self, carp):
+        datos = carp.datos
+        lista = datos['LISTA_ARISTAS_REQ']
+        self.depositos = np.array(depositos_de(datos), dtype=np.int64)
+        self.dep = int(self.depositos[0])
+        self.cap_max, self.dur_max, self.flota_abierta = carp.limites()
+        self.vehiculos = datos.get('VEHICULOS', 1)
+        self.D = carp.m_dist
+        self._recorrer_ruta = carp._recorrer_ruta
+        self.ids = np.array(carp.alcanzables, dtype=np.int64)
+        self.U = np.array([lista[t - 1]['arco'][0] for t in self.ids], dtype=np.int64)
+        self.V = np.array([lista[t - 1]['arco'][1] for t in self.ids], dtype=np.int64)
+        self.C = np.array([lista[t - 1]['coste'] for t in self.ids], dtype=float)
+        self.DEM = np.array([lista[t - 1]['demanda'] for t in self.ids], dtype=float)
+        # Distancias de cada nodo al depósito más cercano (ida y vuelta) y de cada
+        # depósito a cada tarea
+        self.al_deposito = self.D[:, self.depositos].min(axis=1)
+        self.desde_deposito = self.D[self.depositos].min(axis=0)
+        filas = self.D[self.depositos]
+        self.deposito_tarea = np.minimum(filas[:, self.U], filas[:, self.V])
+
+    def deposito_para(self, pendientes):
+        """Depósito más cercano a alguna de las tareas `pendientes` (máscara o índices)."""
+        if len(self.depositos) == 1:
+            return self.dep
+        return int(self.depositos[np.argmin(self.deposito_tarea[:, pendientes].min(axis=1))])
+
+    def a_solucion(self, rutas):
+        """
+        Convierte rutas de índices locales a IDs de tarea y rellena hasta VEHICULOS. Sin
+        flota abierta, las rutas que sobran se eliminan con _ajustar_flota; si no se
+        puede, ValueError.
+        """
+        rutas = [ruta for ruta in rutas if ruta]
+        if not self.flota_abierta and len(rutas) > self.vehiculos:
+            rutas = _ajustar_flota(self, rutas)
+            if len(rutas) > self.vehiculos:
+                raise ValueError(f"La solución construida necesita {len(rutas)} rutas y la flota "
+                                 f"tiene {self.vehiculos} vehículos (VEHICULOS); aumenta "
+                                 f"VEHICULOS o usa flota abierta")
+        solucion = [[int(self.ids[k]) for k in ruta] for ruta in rutas]
+        solucion.extend([] for _ in range(self.vehiculos - len(solucion)))
+        return solucion
+
+    def recorrer(self, ruta, dep=None):
+        """Nodos de entrada y salida de cada tarea con la orientación de la evaluación de CarpLib."""
+        pos, entradas, salidas = self.dep if dep is None else dep, [], []
+        for k in ruta:
+            u, v = self.U[k], self.V[k]
+            if self.D[pos, u] <= self.D[pos, v]:
+                entradas.append(u); salidas.append(v)
+            else:
+                entradas.append(v); salidas.append(u)
+            pos = salidas[-1]
+        return entradas, salidas
+
+    def costo(self, ruta):
+        """Costo de la ruta (índices locales) con la evaluación de CarpLib."""
+        return self._recorrer_ruta(self.ids[ruta].tolist())[0]
+
+
+# ---------------------------------------------------------------------------
+# Path-scanning y GRASP
+# ---------------------------------------------------------------------------
+def _escanear(T, elegir, vivas=None):
+    """
+    Construye rutas una a una: desde la posición actual se toma la tarea más cercana
+    que cabe en el vehículo; elegir(candidatos, d, salidas, carga) decide entre ellas.
+    `vivas` (máscara) limita las tareas a servir; por defecto todas.
+    """
+    D, cap_max, dur_max = T.D, T.cap_max, T.dur_max
+    vivas = np.ones(len(T.ids), dtype=bool) if vivas is None else vivas.copy()
+    rutas = []
+    while vivas.any():
+        dep = T.deposito_para(vivas)
+        ruta, pos, carga, costo = [], dep, 0.0, 0.0
+        while True:
+            caben = vivas & (T.DEM + carga <= cap_max)
+            d_u, d_v = D[pos, T.U], D[pos, T.V]
+            salidas = np.where(d_u <= d_v, T.V, T.U)
+            if dur_max != np.inf:
+                # La ruta vuelve a su depósito de salida
+                caben &= costo + np.minimum(d_u, d_v) + T.C + D[salidas, dep] <= dur_max
+            if not caben.any():
+                if not ruta:
+                    # Demanda o duración sobre el límite: ruta propia (infactible)
+                    caben = vivas
+                else:
+                    break
+            d = np.where(caben, np.minimum(d_u, d_v), np.inf)
+            k = elegir(np.flatnonzero(caben), d, salidas, carga)
+            ruta.append(k)
+            vivas[k] = False
+            carga += T.DEM[k]
+            costo += d[k] + T.C[k]
+            pos = salidas[k]
+        rutas.append(ruta)
+    return rutas
+
+
+def _regla(regla, T):
+    al_deposito = T.al_deposito
+    razon = T.DEM / np.maximum(T.C, _EPS)
+
+    def elegir(candidatos, d, salidas, carga):
+        empatados = candidatos[d[candidatos] <= d[candidatos].min() + _EPS]
+        r = regla
+        if r == 5:
+            r = 1 if carga < T.cap_max / 2 else 2
+        if r == 1:
+            criterio = -al_deposito[salidas[empatados]]
+        elif r == 2:
+            criterio = al_deposito[salidas[empatados]]
+        elif r == 3:
+            criterio = -razon[empatados]
+        else:
+            criterio = razon[empatados]
+        return int(empatados[np.argmin(criterio)])
+
+    return elegir
+
+
+def path_scanning(carp, regla=None):
+    """
+    Path-scanning. Con regla=None construye con las cinco reglas y retorna la mejor:
+     1: maximizar la distancia del final de la tarea al depósito
+     2: minimizarla
+     3: maximizar demanda / coste
+     4: minimizar demanda / coste
+     5: regla 1 si el vehículo va por debajo de media capacidad, si no regla 2
+    """
+    T = _Tareas(carp)
+    reglas = REGLAS if regla is None else (regla,)
+    for r in reglas:
+        if r not in REGLAS:
+            raise ValueError(f"Regla de path-scanning desconocida: {r}")
+    return _mejor_construccion(carp, T, (_regla(r, T) for r in reglas))
+
+
+def grasp(carp, alfa=0.2, construcciones=1):
+    """
+    Path-scanning aleatorizado: en cada paso se elige al azar entre las tareas que caben
+    con distancia en [dmin, dmin + alfa·(dmax − dmin)]. Retorna la mejor de las construcciones.
+    """
+    T = _Tareas(carp)
+
+    def elegir(candidatos, d, salidas, carga):
+        dc = d[candidatos]
+        dmin = dc.min()
+        lrc = candidatos[dc <= dmin + alfa * (dc.max() - dmin) + _EPS]
+        return int(random.choice(lrc))
+
+    return _mejor_construccion(carp, T, (elegir for _ in range(construcciones)))
+
+
+def _mejor_construccion(carp, T, elecciones):
+    """
+    Mejor solución de path-scanning con cada función de elección. Las construcciones que
+    no caben en la flota se descartan; si no cabe ninguna se relanza el último ValueError.
+    """
+    mejor, costo_mejor, error = None, float('inf'), None
+    for elegir in elecciones:
+        try:
+            solucion = T.a_solucion(_escanear(T, elegir))
+        except ValueError as e:
+            error = e
+            continue
+        costo = carp.calcular_costo_y_factibilidad(solucion)
+        if mejor is None or costo < costo_mejor:
+            mejor, costo_mejor = solucion, costo
+    if mejor is None:
+        raise error
+    return mejor
+
+
+# ---------------------------------------------------------------------------
+# Augment-merge
+# ---------------------------------------------------------------------------
+def _aumentar(T):
+    """
+    Fase de aumento: partiendo de una ruta por tarea, en orden de costo decreciente, cada
+    ruta absorbe las tareas de rutas menores que están sobre sus caminos mínimos de
+    deadheading (su servicio no añade costo) mientras quepan en el vehículo.
+    """
+    D, desde, al = T.D, T.desde_deposito, T.al_deposito
+    costo_solo = np.minimum(desde[T.U] + al[T.V], desde[T.V] + al[T.U]) + T.C
+    libres = np.ones(len(T.ids), dtype=bool)
+    rutas = []
+    for k in np.argsort(-costo_solo, kind="stable"):
+        if not libres[k]:
+            continue
+        libres[k] = False
+        ruta, carga, dep = [int(k)], T.DEM[k], T.deposito_para([k])
+        while True:
+            candidatos = np.flatnonzero(libres & (T.DEM + carga <= T.cap_max))
+            if candidatos.size == 0:
+                break
+            entradas, salidas = T.recorrer(ruta, dep)
+            x = np.array([dep] + salidas)[:, None]   # inicio de cada tramo de deadheading
+            y = np.array(entradas + [dep])[:, None]  # fin de cada tramo
+            Uc, Vc, Cc = T.U[candidatos], T.V[candidatos], T.C[candidatos]
+            en_camino = (np.minimum(D[x, Uc] + D[Vc, y], D[x, Vc] + D[Uc, y]) + Cc
+                         <= D[x, y] + _EPS)
+            if not en_camino.any():
+                break
+            # Como máximo una tarea por tramo y ronda; de derecha a izquierda para no mover índices
+            insertadas = False
+            for tramo in range(en_camino.shape[0] - 1, -1, -1):
+                for c in np.flatnonzero(en_camino[tramo]):
+                    k2 = candidatos[c]
+                    if libres[k2] and carga + T.DEM[k2] <= T.cap_max:
+                        ruta.insert(tramo, int(k2))
+                        libres[k2] = False
+                        carga += T.DEM[k2]
+                        insertadas = True
+                        break
+            if not insertadas:
+                break
+        rutas.append(ruta)
+    return rutas
+
+
+def _fusionar(T, rutas, vecinos, hasta=None):
+    """
+    Fase de fusión (ahorros de Clarke y Wright): se unen extremos de rutas distintas
+    en orden de ahorro D[a, dep] + D[dep, b] − D[a, b] mientras quepan en el vehículo
+    (y, con duración máxima, la ruta unida no la supere).
+    Por cada extremo solo se consideran sus `vecinos` mejores ahorros. Con `hasta` se
+    aceptan también ahorros no positivos y se para al quedar `hasta` rutas.
+    """
+    D = T.D
+    extremos = []
+    for ruta in rutas:
+        entradas, salidas = T.recorrer(ruta, T.deposito_para([ruta[0]]))
+        extremos.extend((entradas[0], salidas[-1]))
+    E = np.array(extremos, dtype=np.int64)
+    n_ext = len(E)
+    if n_ext < 4:
+        return rutas
+
+    k = min(vecinos, n_ext - 1)
+    pares_i, pares_j, ahorros = [], [], []
+    a_dep, dep_b = T.al_deposito[E], T.desde_deposito[E]
+    for ini in range(0, n_ext, 512):
+        filas = np.arange(ini, min(ini + 512, n_ext))
+        S = a_dep[filas, None] + dep_b[None, :] - D[E[filas][:, None], E[None, :]]
+        S[(filas[:, None] // 2) == (np.arange(n_ext)[None, :] // 2)] = -np.inf  # misma ruta
+        top = np.argpartition(-S, k - 1, axis=1)[:, :k]
+        s_top = np.take_along_axis(S, top, axis=1)
+        i_top = np.broadcast_to(filas[:, None], top.shape)
+        util = (s_top > (0 if hasta is None else -np.inf)) & (i_top < top)
+        pares_i.append(i_top[util]); pares_j.append(top[util]); ahorros.append(s_top[util])
+    pares_i, pares_j = np.concatenate(pares_i), np.concatenate(pares_j)
+    orden = np.argsort(-np.concatenate(ahorros), kind="stable")
+
+    # Cada ruta actual guarda sus dos extremos externos [inicio, fin]; dueno[e] = ruta o -1
+    tareas = {r: list(ruta) for r, ruta in enumerate(rutas)}
+    ext = {r: [2 * r, 2 * r + 1] for r in tareas}
+    carga = {r: float(T.DEM[ruta].sum()) for r, ruta in tareas.items()}
+    dueno = np.repeat(np.arange(len(rutas)), 2)
+    for i, j in zip(pares_i[orden].tolist(), pares_j[orden].tolist()):
+        ri, rj = dueno[i], dueno[j]
+        if ri < 0 or rj < 0 or ri == rj or carga[ri] + carga[rj] > T.cap_max:
+            continue
+        if T.dur_max != np.inf:
+            a = tareas[ri] if ext[ri][1] == i else tareas[ri][::-1]
+            b = tareas[rj] if ext[rj][0] == j else tareas[rj][::-1]
+            if T.costo(a + b) > T.dur_max:
+                continue
+        # ri debe terminar en i y rj empezar en j
+        if ext[ri][0] == i:
+            tareas[ri].reverse(); ext[ri].reverse()
+        if ext[rj][1] == j:
+            tareas[rj].reverse(); ext[rj].reverse()
+        tareas[ri].extend(tareas.pop(rj))
+        otro_j = ext.pop(rj)[1]
+        ext[ri][1] = otro_j
+        carga[ri] += carga.pop(rj)
+        dueno[i] = dueno[j] = -1
+        dueno[otro_j] = ri
+        if hasta is not None and len(tareas) <= hasta:
+            break
+    return list(tareas.values())
+
+
+def _vaciar(T, rutas, r, parcial=False):
+    """
+    Reparte las tareas de la ruta r, de mayor a menor demanda, en la posición de inserción
+    más barata de otra ruta donde quepan (y, con duración máxima, no la superen). Retorna
+    las rutas sin r, o None si alguna tarea no cabe en ninguna parte. Con parcial=True
+    las tareas que no caben se quedan en r y se retorna None solo si no se movió ninguna.
+    """
+    D = T.D
+    otras = [list(ruta) for j, ruta in enumerate(rutas) if j != r]
+    cargas = [float(T.DEM[ruta].sum()) for ruta in otras]
+    tramos = [None] * len(otras)   # (inicios, finales) de los tramos de deadheading de cada ruta
+    quedan = []
+    for k in sorted(rutas[r], key=lambda k: -T.DEM[k]):
+        candidatos = []
+        for j, ruta in enumerate(otras):
+            if cargas[j] + T.DEM[k] > T.cap_max:
+                continue
+            if tramos[j] is None:
+                dep = T.deposito_para([ruta[0]])
+                entradas, salidas = T.recorrer(ruta, dep)
+                tramos[j] = (np.array([dep] + salidas), np.array(entradas + [dep]))
+            x, y = tramos[j]
+            delta = (np.minimum(D[x, T.U[k]] + D[T.V[k], y], D[x, T.V[k]] + D[T.U[k], y])
+                     + T.C[k] - D[x, y])
+            pos = int(np.argmin(delta))
+            candidatos.append((float(delta[pos]), j, pos))
+        for _, j, pos in sorted(candidatos):
+            nueva = otras[j][:pos] + [k] + otras[j][pos:]
+            if T.dur_max == np.inf or T.costo(nueva) <= T.dur_max:
+                otras[j] = nueva
+                cargas[j] += T.DEM[k]
+                tramos[j] = None
+                break
+        else:
+            if not parcial:
+                return None
+            quedan.append(k)
+    if not quedan:
+        return otras
+    if len(quedan) == len(rutas[r]):
+        return None
+    # Las tareas que quedan conservan su orden en la ruta
+    return otras + [[k for k in rutas[r] if k in quedan]]
+
+
+def _ajustar_flota(T, rutas):
+    """
+    Reduce el número de rutas hasta VEHICULOS: primero se unen rutas enteras con
+    _fusionar (admitiendo ahorros no positivos) y, si siguen sobrando, se vacía la ruta
+    de menor carga que se pueda repartir entre las demás (_vaciar) y se vuelve a fusionar.
+    Si ninguna se puede vaciar del todo, se saca de la de menor carga lo que quepa en
+    otras rutas, para que lo que queda se pueda fusionar. Como último recurso se
+    reconstruyen las rutas menos cargadas con _reempaquetar. Retorna las rutas, que
+    pueden seguir siendo más que VEHICULOS si no se puede más.
+    """
+    for _ in range(len(T.ids) + 1):
+        rutas = _fusionar(T, rutas, len(rutas), hasta=T.vehiculos)
+        if len(rutas) <= T.vehiculos:
+            return rutas
+        orden = np.argsort([T.DEM[ruta].sum() for ruta in rutas], kind="stable").tolist()
+        for r in orden:
+            repartidas = _vaciar(T, rutas, r)
+            if repartidas is not None:
+                break
+        else:
+            repartidas = _vaciar(T, rutas, orden[0], parcial=True)
+            if repartidas is None:
+                break
+        rutas = repartidas
+    return _reempaquetar(T, rutas)
+
+
+def _reempaquetar(T, rutas):
+    """
+    Conserva las m rutas más cargadas y sirve las tareas del resto con path-scanning,
+    que llena cada vehículo antes de abrir otro. Se usa el mayor m con el que alguna de
+    las reglas cabe en VEHICULOS; si no cabe con ninguno, se retornan las rutas sin cambios.
+    """
+    rutas = sorted(rutas, key=lambda ruta: -T.DEM[ruta].sum())
+    reglas = [_regla(r, T) for r in REGLAS]
+    for m in range(T.vehiculos - 1, -1, -1):
+        vivas = np.zeros(len(T.ids), dtype=bool)
+        for ruta in rutas[m:]:
+            vivas[ruta] = True
+        for elegir in reglas:
+            nuevas = _escanear(T, elegir, vivas)
+            if m + len(nuevas) <= T.vehiculos:
+                return rutas[:m] + nuevas
+    return rutas
+
+
+def augment_merge(carp, vecinos=40):
+    """Augment-merge: fase de aumento seguida de fusión de rutas por ahorros."""
+    T = _Tareas(carp)
+    return T.a_solucion(_fusionar(T, _aumentar(T), vecinos))
+
+
+METODOS = {
+    "path_scanning": path_scanning,
+    "augment_merge": augment_merge,
+    "grasp": grasp,
+}
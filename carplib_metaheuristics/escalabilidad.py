@@ -0,0 +1,108 @@
+"""
+Prueba de escalabilidad de CarpLib sobre instancias sintéticas de tamaño creciente.
+
+Para cada tamaño se genera una instancia con generador.py y se mide cada etapa:
+lectura del .dat, grafo, análisis del grafo, matriz de distancias (APSP), construcción
+(path-scanning), evaluación completa, mutación y evaluación incremental.
+La matriz de distancias es densa, (V+1)² flotantes: si supera limite_memoria_mb se
+omite esa etapa y las que dependen de ella (quedan como NaN en la tabla).
+"""
+
+import contextlib
+import io
+import math
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from .generador import escribir_dat, generar_instancia
+from .modelo import CarpLib
+
+TAMANOS = (100, 1000, 10000, 100000)
+
+
+def _medir(funcion, *args, **kwargs):
+    """(segundos, resultado) de una llamada, silenciando lo que imprima CarpLib."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        t = time.perf_counter()
+        resultado = funcion(*args, **kwargs)
+        return time.perf_counter() - t, resultado
+
+
+def _por_segundo(funcion, tiempo_min=0.2):
+    """Llamadas por segundo de funcion() repitiéndola durante al menos tiempo_min segundos."""
+    n, t0 = 0, time.perf_counter()
+    while True:
+        funcion()
+        n += 1
+        transcurrido = time.perf_counter() - t0
+        if transcurrido >= tiempo_min:
+            return n / transcurrido
+
+
+def medir_instancia(ruta, limite_memoria_mb=2048, algoritmo_dist="dijkstra"):
+    """Tiempos por etapa (segundos) y rendimientos (operaciones/segundo) para un archivo .dat."""
+    carp = CarpLib()
+    fila = {}
+    fila['leer'], carp.datos = _medir(carp._leer_dat, ruta)
+    n, m = carp.datos['VERTICES'], len(carp.datos['LISTA_ARISTAS_REQ'])
+    fila.update(vertices=n, tareas=m, memoria_apsp_mb=(n + 1) ** 2 * 8 / 2**20)
+    fila['grafo'], _ = _medir(carp.construir_grafo)
+    fila['analisis'], _ = _medir(carp.analizar_grafo)
+    if fila['memoria_apsp_mb'] > limite_memoria_mb:
+        return fila
+
+    fila['apsp'], _ = _medir(carp.generar_matriz_distancias, algoritmo_dist)
+    fila['construir'], solucion = _medir(carp.generar_solucion_inicial, "path_scanning", regla=1)
+
+    def evaluar_en_frio():
+        carp.cache_rutas.limpiar()
+        carp.calcular_costo_y_factibilidad(solucion)
+
+    def mutar_y_evaluar():
+        nueva, _, rutas = carp.mutar(solucion, random.choice(("swap", "insertion", "inversion")),
+                                     devolver_rutas=True)
+        for r in rutas:
+            carp.calcular_costo_ruta(nueva[r])
+
+    fila['evaluaciones_s'] = _por_segundo(evaluar_en_frio)
+    fila['mutaciones_s'] = _por_segundo(lambda: carp.mutar(solucion, random.choice(("swap", "insertion", "inversion"))))
+    fila['mutar_evaluar_s'] = _por_segundo(mutar_y_evaluar)
+    return fila
+
+
+def escalabilidad(tamanos=TAMANOS, tipo="calles", carpeta=None, limite_memoria_mb=2048,
+                  semilla=0, **parametros):
+    """
+    Genera una instancia por tamaño (número aproximado de aristas requeridas) y retorna
+    un DataFrame con una fila por tamaño. Los parámetros adicionales van a generar_instancia.
+    """
+    carpeta = carpeta or tempfile.mkdtemp(prefix="carp_escalabilidad_")
+    os.makedirs(carpeta, exist_ok=True)
+    random.seed(semilla)
+    filas = []
+    for aristas in tamanos:
+        t_gen, datos = _medir(generar_instancia, tipo, n_vertices=max(4, math.ceil(aristas / 2)),
+                              n_aristas=aristas, semilla=semilla, **parametros)
+        ruta = os.path.join(carpeta, f"{tipo}_{aristas}.dat")
+        t_esc, _ = _medir(escribir_dat, datos, ruta)
+        fila = {'aristas_objetivo': aristas, 'generar': t_gen, 'escribir': t_esc}
+        fila.update(medir_instancia(ruta, limite_memoria_mb=limite_memoria_mb))
+        filas.append(fila)
+    return pd.DataFrame(filas).set_index('aristas_objetivo')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prueba de escalabilidad de CarpLib")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS))
+    parser.add_argument("--tipo", default="calles")
+    parser.add_argument("--carpeta", default=None)
+    parser.add_argument("--limite-memoria-mb", type=float, default=2048)
+    args = parser.parse_args()
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(escalabilidad(args.tamanos, args.tipo, args.carpeta, args.limite_memoria_mb))
@@ -0,0 +1,307 @@
+"""
+Núcleos de evaluación de rutas sobre arreglos planos.
+
+El recorrido voraz de una ruta (desde la posición actual se entra a cada tarea por su
+extremo más cercano) se hace sobre datos preparados una sola vez por instancia: extremos,
+costes y demandas de las tareas en listas indexadas por id de tarea, y la matriz de
+distancias vista como un memoryview plano de float64 (sin copiarla). Así el bucle interno
+no consulta diccionarios ni crea vistas de fila de NumPy.
+
+Backends:
+ - "python": bucle en Python puro sobre esas estructuras (siempre disponible).
+ - "numba" : el mismo bucle compilado con Numba, si está instalado.
+Ambos hacen las mismas operaciones en el mismo orden, por lo que dan resultados idénticos.
+
+Con varios depósitos (datos['DEPOSITOS']) cada ruta sale y vuelve al depósito que le da
+menor costo. Tras la primera tarea el recorrido voraz solo depende del extremo por el que
+se sale de ella, así que basta recorrer la ruta dos veces (saliendo por cada extremo) y
+combinar esas dos cadenas con las filas de distancias de los depósitos, que se guardan
+aparte al preparar el evaluador: el costo no crece con el número de depósitos.
+"""
+
+import itertools
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Numba es opcional
+    numba = None
+
+BACKENDS = ("python", "numba")
+
+# Sustituye inf en la matriz finita (matriz_finita) para que las diferencias no den nan
+INF_FINITO = 1e15
+
+
+def backends_disponibles():
+    return tuple(b for b in BACKENDS if b != "numba" or numba is not None)
+
+
+def depositos_de(datos):
+    """Depósitos de la instancia: datos['DEPOSITOS'] si existe, si no solo datos['DEPOSITO']."""
+    depositos = datos.get('DEPOSITOS') or [datos.get('DEPOSITO', 1)]
+    return tuple(int(d) for d in depositos)
+
+
+def validar_backend(backend=None):
+    """Nombre del backend a usar; None elige el más rápido disponible."""
+    if backend is None:
+        return "numba" if numba is not None else "python"
+    if backend not in backends_disponibles():
+        raise ValueError(f"Backend de evaluación no disponible: {backend} "
+                         f"(disponibles: {', '.join(backends_disponibles())})")
+    return backend
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _recorrer_numba(ruta, dep, m_dist, u_t, v_t, coste_t, demanda_t):
+        costo, carga, pos = 0.0, 0, dep
+        for k in range(ruta.shape[0]):
+            t = ruta[k]
+            u, v = u_t[t], v_t[t]
+            carga += demanda_t[t]
+            d_u, d_v = m_dist[pos, u], m_dist[pos, v]
+            if d_u == np.inf and d_v == np.inf:
+                return np.inf, carga
+            if d_u <= d_v:
+                costo += d_u + coste_t[t]
+                pos = v
+            else:
+                costo += d_v + coste_t[t]
+                pos = u
+        if m_dist[pos, dep] == np.inf:
+            return np.inf, carga
+        return costo + m_dist[pos, dep], carga
+
+    @numba.njit(cache=True)
+    def _recorrer_varias_numba(tareas, inicios, dep, m_dist, u_t, v_t, coste_t, demanda_t):
+        n_rutas = inicios.shape[0] - 1
+        costos = np.empty(n_rutas)
+        cargas = np.empty(n_rutas, dtype=np.int64)
+        for r in range(n_rutas):
+            costos[r], cargas[r] = _recorrer_numba(tareas[inicios[r]:inicios[r + 1]], dep, m_dist,
+                                                   u_t, v_t, coste_t, demanda_t)
+        return costos, cargas
+
+    @numba.njit(cache=True)
+    def _recorrer_multi_numba(ruta, deps, desde, hacia, m_dist, u_t, v_t, coste_t, demanda_t):
+        t0 = ruta[0]
+        u0, v0 = u_t[t0], v_t[t0]
+        carga = 0
+        for k in range(ruta.shape[0]):
+            carga += demanda_t[ruta[k]]
+        # Cadenas tras la primera tarea saliendo por v0 (c = 0) o por u0 (c = 1); solo
+        # las que usa algún depósito
+        usadas = np.zeros(2, dtype=np.bool_)
+        for j in range(deps.shape[0]):
+            usadas[0 if desde[j, u0] <= desde[j, v0] else 1] = True
+        cadenas = np.zeros(2)
+        finales = np.zeros(2, dtype=np.int64)
+        for c in range(2):
+            if not usadas[c]:
+                continue
+            pos = v0 if c == 0 else u0
+            for k in range(1, ruta.shape[0]):
+                t = ruta[k]
+                u, v = u_t[t], v_t[t]
+                d_u, d_v = m_dist[pos, u], m_dist[pos, v]
+                if d_u == np.inf and d_v == np.inf:
+                    cadenas[c] = np.inf
+                    break
+                if d_u <= d_v:
+                    cadenas[c] += d_u + coste_t[t]
+                    pos = v
+                else:
+                    cadenas[c] += d_v + coste_t[t]
+                    pos = u
+            finales[c] = pos
+        mejor, elegido = np.inf, 0
+        for j in range(deps.shape[0]):
+            d_u, d_v = desde[j, u0], desde[j, v0]
+            c = 0 if d_u <= d_v else 1
+            total = min(d_u, d_v) + coste_t[t0] + cadenas[c] + hacia[j, finales[c]]
+            if total < mejor:
+                mejor, elegido = total, j
+        return mejor, carga, elegido
+
+    @numba.njit(cache=True)
+    def _recorrer_varias_multi_numba(tareas, inicios, deps, desde, hacia, m_dist, u_t, v_t,
+                                     coste_t, demanda_t):
+        n_rutas = inicios.shape[0] - 1
+        costos = np.zeros(n_rutas)
+        cargas = np.zeros(n_rutas, dtype=np.int64)
+        for r in range(n_rutas):
+            if inicios[r + 1] > inicios[r]:
+                costos[r], cargas[r], _ = _recorrer_multi_numba(
+                    tareas[inicios[r]:inicios[r + 1]], deps, desde, hacia, m_dist,
+                    u_t, v_t, coste_t, demanda_t)
+        return costos, cargas
+
+
+class EvaluadorRutas:
+    """
+    Evaluador de rutas de una instancia (datos y m_dist de CarpLib).
+
+    recorrer(ruta) retorna (costo, carga) como floats/ints de Python; con `segmentos`
+    añade además los tramos de deadheading (desde, hasta, distancia), que siempre se
+    calculan con el backend "python". deposito_de_ruta(ruta) es el depósito desde el
+    que se evalúa la ruta (el primero si la ruta está vacía). matriz_finita() es la
+    matriz de distancias con inf sustituido por INF_FINITO, que se prepara una sola vez.
+    """
+
+    def __init__(self, datos, m_dist, backend=None):
+        self.backend = validar_backend(backend)
+        self.datos = datos
+        self.m_dist = m_dist
+        self.depositos = depositos_de(datos)
+        self.deposito = self.depositos[0]
+
+        tareas = datos['LISTA_ARISTAS_REQ']
+        # Posición 0 sin uso: las tareas se numeran desde 1
+        self._u = [0] + [it['arco'][0] for it in tareas]
+        self._v = [0] + [it['arco'][1] for it in tareas]
+        self._coste = [0] + [it['coste'] for it in tareas]
+        self._demanda = [0] + [it['demanda'] for it in tareas]
+        self._dist_arr = np.ascontiguousarray(m_dist, dtype=np.float64)
+        self._n = self._dist_arr.shape[1]
+        self._dist = memoryview(self._dist_arr).cast('B').cast('d')
+        # Filas de distancias desde y hacia cada depósito
+        self._multi = len(self.depositos) > 1
+        deps = list(self.depositos)
+        self._desde_arr = np.ascontiguousarray(self._dist_arr[deps])
+        self._hacia_arr = np.ascontiguousarray(self._dist_arr[:, deps].T)
+        self._desde, self._hacia = self._desde_arr.tolist(), self._hacia_arr.tolist()
+        if self.backend == "numba":
+            self._arrays = (np.array(self._u, dtype=np.int64), np.array(self._v, dtype=np.int64),
+                            np.array(self._coste, dtype=np.float64),
+                            np.array(self._demanda, dtype=np.int64))
+            self._deps_arr = np.array(deps, dtype=np.int64)
+        self._finita = None
+
+    def recorrer(self, ruta, segmentos=None):
+        if self.backend == "numba" and segmentos is None:
+            if not self._multi:
+                costo, carga = _recorrer_numba(np.array(ruta, dtype=np.int64), self.deposito,
+                                               self._dist_arr, *self._arrays)
+            elif not ruta:
+                return 0.0, 0
+            else:
+                costo, carga, _ = _recorrer_multi_numba(np.array(ruta, dtype=np.int64), self._deps_arr,
+                                                        self._desde_arr, self._hacia_arr,
+                                                        self._dist_arr, *self._arrays)
+            return float(costo), int(carga)
+        if self._multi and ruta:
+            costo, carga, j = self._recorrer_multi(ruta)
+            if segmentos is not None and costo != float('inf'):
+                self._recorrer_python(ruta, segmentos, self.depositos[j])
+            return costo, carga
+        return self._recorrer_python(ruta, segmentos)
+
+    def matriz_finita(self):
+        """
+        (arreglo, memoryview plano) de la matriz de distancias sin inf: el arreglo para
+        operaciones vectorizadas y la vista plana (fila * n + columna) para consultas sueltas.
+        """
+        if self._finita is None:
+            arr = np.where(np.isinf(self._dist_arr), INF_FINITO, self._dist_arr)
+            self._finita = (arr, memoryview(arr).cast('B').cast('d'))
+        return self._finita
+
+    def calentar(self):
+        """Evalúa una ruta de prueba para que Numba compile sus núcleos antes del primer uso real."""
+        if self.backend != "numba" or len(self._u) < 2:
+            return
+        self.recorrer([1])
+        self.recorrer_varias([[1], []])
+
+    def deposito_de_ruta(self, ruta):
+        if not self._multi or not ruta:
+            return self.deposito
+        return self.depositos[self._recorrer_multi(ruta)[2]]
+
+    def recorrer_varias(self, rutas):
+        """[(costo, carga)] de varias rutas; con "numba" se evalúan todas en una sola llamada."""
+        if self.backend != "numba":
+            if self._multi:
+                return [self._recorrer_multi(r)[:2] if r else (0.0, 0) for r in rutas]
+            return [self._recorrer_python(r) for r in rutas]
+        largos = np.fromiter(map(len, rutas), dtype=np.int64, count=len(rutas))
+        inicios = np.zeros(len(rutas) + 1, dtype=np.int64)
+        np.cumsum(largos, out=inicios[1:])
+        tareas = np.fromiter(itertools.chain.from_iterable(rutas), dtype=np.int64, count=int(inicios[-1]))
+        if self._multi:
+            costos, cargas = _recorrer_varias_multi_numba(tareas, inicios, self._deps_arr, self._desde_arr,
+                                                          self._hacia_arr, self._dist_arr, *self._arrays)
+        else:
+            costos, cargas = _recorrer_varias_numba(tareas, inicios, self.deposito, self._dist_arr,
+                                                    *self._arrays)
+        return list(zip(costos.tolist(), cargas.tolist()))
+
+    def _recorrer_python(self, ruta, segmentos=None, dep=None):
+        dist, n = self._dist, self._n
+        u_t, v_t, coste_t, demanda_t = self._u, self._v, self._coste, self._demanda
+        inf = float('inf')
+        if dep is None:
+            dep = self.deposito
+        costo, carga, pos = 0.0, 0, dep
+        for t in ruta:
+            u, v = u_t[t], v_t[t]
+            carga += demanda_t[t]
+            fila = pos * n
+            d_u, d_v = dist[fila + u], dist[fila + v]
+            if d_u == inf and d_v == inf:
+                return inf, carga
+            if d_u <= d_v:
+                d, llegada = d_u, v
+            else:
+                d, llegada = d_v, u
+            if segmentos is not None:
+                segmentos.append((pos, llegada, d))
+            costo += d + coste_t[t]
+            pos = llegada
+        regreso = dist[pos * n + dep]
+        if regreso == inf:
+            return inf, carga
+        if segmentos is not None:
+            segmentos.append((pos, dep, regreso))
+        return costo + regreso, carga
+
+    def _recorrer_multi(self, ruta):
+        """(costo, carga, índice del mejor depósito); mismas operaciones que el núcleo Numba."""
+        dist, n = self._dist, self._n
+        u_t, v_t, coste_t, demanda_t = self._u, self._v, self._coste, self._demanda
+        inf = float('inf')
+        t0 = ruta[0]
+        u0, v0 = u_t[t0], v_t[t0]
+        carga = 0
+        for t in ruta:
+            carga += demanda_t[t]
+        usadas = {0 if desde[u0] <= desde[v0] else 1 for desde in self._desde}
+        cadenas, finales = [0.0, 0.0], [0, 0]
+        for c, pos in enumerate((v0, u0)):
+            if c not in usadas:
+                continue
+            for t in ruta[1:]:
+                u, v = u_t[t], v_t[t]
+                fila = pos * n
+                d_u, d_v = dist[fila + u], dist[fila + v]
+                if d_u == inf and d_v == inf:
+                    cadenas[c] = inf
+                    break
+                if d_u <= d_v:
+                    cadenas[c] += d_u + coste_t[t]
+                    pos = v
+                else:
+                    cadenas[c] += d_v + coste_t[t]
+                    pos = u
+            finales[c] = pos
+        mejor, elegido = inf, 0
+        for j, (desde, hacia) in enumerate(zip(self._desde, self._hacia)):
+            d_u, d_v = desde[u0], desde[v0]
+            c = 0 if d_u <= d_v else 1
+            total = min(d_u, d_v) + coste_t[t0] + cadenas[c] + hacia[finales[c]]
+            if total < mejor:
+                mejor, elegido = total, j
+        return mejor, carga, elegido
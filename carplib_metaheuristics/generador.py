@@ -0,0 +1,229 @@
+"""
+Generador de instancias CARP sintéticas en el formato .dat que lee CarpLib._leer_dat.
+
+Tipos de grafo:
+ - "grid"       : malla rectangular con aristas entre vecinos horizontales y verticales
+ - "geometrico" : puntos aleatorios en el cuadrado unidad unidos con sus vecinos más cercanos
+ - "calles"     : malla perturbada con diagonales ocasionales y avenidas más rápidas
+
+Todas las aristas son requeridas. El grafo siempre es conexo: primero se toma un árbol
+generador aleatorio de las aristas candidatas y después se añaden candidatas al azar
+hasta llegar a n_aristas.
+"""
+
+import math
+
+import numpy as np
+
+TIPOS = ("grid", "geometrico", "calles")
+
+
+# ---------------------------------------------------------------------------
+# Aristas candidatas por tipo de grafo (vértices numerados desde 0)
+# ---------------------------------------------------------------------------
+def _malla(n_vertices):
+    filas = max(2, int(math.sqrt(n_vertices)))
+    columnas = max(2, math.ceil(n_vertices / filas))
+    idx = np.arange(filas * columnas).reshape(filas, columnas)
+    horizontales = np.stack([idx[:, :-1].ravel(), idx[:, 1:].ravel()], axis=1)
+    verticales = np.stack([idx[:-1, :].ravel(), idx[1:, :].ravel()], axis=1)
+    filas_idx, cols_idx = np.divmod(np.arange(filas * columnas), columnas)
+    posiciones = np.stack([cols_idx, filas_idx], axis=1).astype(float)
+    return idx, horizontales, verticales, posiciones
+
+
+def _candidatas_grid(n_vertices, rng):
+    _, horizontales, verticales, posiciones = _malla(n_vertices)
+    aristas = np.concatenate([horizontales, verticales])
+    return posiciones, aristas, np.ones(len(aristas))
+
+
+def _candidatas_calles(n_vertices, rng, cada_avenida=5, factor_avenida=0.6, p_diagonal=0.1):
+    idx, horizontales, verticales, posiciones = _malla(n_vertices)
+    posiciones = posiciones + rng.uniform(-0.3, 0.3, size=posiciones.shape)
+    diagonales = np.stack([idx[:-1, :-1].ravel(), idx[1:, 1:].ravel()], axis=1)
+    diagonales = diagonales[rng.random(len(diagonales)) < p_diagonal]
+    aristas = np.concatenate([horizontales, verticales, diagonales])
+    # Avenidas: filas y columnas cada `cada_avenida` con menor costo por unidad de longitud
+    filas, columnas = idx.shape
+    fila, col = np.divmod(aristas, columnas)
+    avenida = (((fila[:, 0] == fila[:, 1]) & (fila[:, 0] % cada_avenida == 0))
+               | ((col[:, 0] == col[:, 1]) & (col[:, 0] % cada_avenida == 0)))
+    return posiciones, aristas, np.where(avenida, factor_avenida, 1.0)
+
+
+def _candidatas_geometrico(n_vertices, rng, vecinos):
+    posiciones = rng.random((n_vertices, 2))
+    # Rejilla de celdas con ~4 puntos cada una; se buscan vecinos en un anillo de celdas
+    celdas = max(1, int(math.sqrt(n_vertices / 4)))
+    cx = np.minimum((posiciones[:, 0] * celdas).astype(int), celdas - 1)
+    cy = np.minimum((posiciones[:, 1] * celdas).astype(int), celdas - 1)
+    celda = cx * celdas + cy
+    orden = np.argsort(celda, kind="stable")
+    ordenadas = celda[orden]
+    inicio = np.searchsorted(ordenadas, np.arange(celdas * celdas))
+    fin = np.searchsorted(ordenadas, np.arange(celdas * celdas), side="right")
+    anillo = max(1, math.ceil(math.sqrt((vecinos + 1) / 4) / 2) + 1)
+
+    pares = []
+    for x in range(celdas):
+        for y in range(celdas):
+            c = x * celdas + y
+            propios = orden[inicio[c]:fin[c]]
+            if len(propios) == 0:
+                continue
+            cercanas = [orden[inicio[i * celdas + j]:fin[i * celdas + j]]
+                        for i in range(max(0, x - anillo), min(celdas, x + anillo + 1))
+                        for j in range(max(0, y - anillo), min(celdas, y + anillo + 1))]
+            candidatos = np.concatenate(cercanas)
+            d = np.linalg.norm(posiciones[propios][:, None, :] - posiciones[candidatos][None, :, :], axis=2)
+            d[propios[:, None] == candidatos[None, :]] = np.inf
+            k = min(vecinos, len(candidatos) - 1)
+            if k <= 0:
+                continue
+            mas_cercanos = np.argpartition(d, k - 1, axis=1)[:, :k]
+            pares.append(np.stack([np.repeat(propios, k), candidatos[mas_cercanos].ravel()], axis=1))
+    aristas = np.concatenate(pares) if pares else np.empty((0, 2), dtype=np.int64)
+    aristas = np.unique(np.sort(aristas, axis=1), axis=0)
+    return posiciones * math.sqrt(n_vertices), aristas, np.ones(len(aristas))
+
+
+# ---------------------------------------------------------------------------
+# Selección de aristas, demandas y capacidad
+# ---------------------------------------------------------------------------
+def _seleccionar(n_vertices, aristas, n_aristas, rng):
+    """
+    Árbol generador aleatorio (Kruskal) más aristas al azar hasta n_aristas. Si las
+    candidatas no conectan todo el grafo, se añaden enlaces entre componentes.
+    Retorna (índices de candidatas elegidas, enlaces nuevos).
+    """
+    orden = rng.permutation(len(aristas))
+    padre = list(range(n_vertices))
+
+    def raiz(a):
+        while padre[a] != a:
+            padre[a] = padre[padre[a]]
+            a = padre[a]
+        return a
+
+    en_arbol = np.zeros(len(aristas), dtype=bool)
+    for k in orden.tolist():
+        ra, rb = raiz(int(aristas[k, 0])), raiz(int(aristas[k, 1]))
+        if ra != rb:
+            padre[ra] = rb
+            en_arbol[k] = True
+    raices = sorted({raiz(a) for a in range(n_vertices)})
+    enlaces = np.array(list(zip(raices[:-1], raices[1:])), dtype=np.int64).reshape(-1, 2)
+    resto = orden[~en_arbol[orden]]
+    extra = max(0, min(n_aristas, len(aristas)) - int(en_arbol.sum()) - len(enlaces))
+    return np.sort(np.concatenate([np.flatnonzero(en_arbol), resto[:extra]])), enlaces
+
+
+def _demandas(distribucion, costes, rng):
+    nombre, *params = distribucion
+    m = len(costes)
+    if nombre == "uniforme":
+        a, b = params
+        return rng.integers(a, b + 1, size=m)
+    if nombre == "poisson":
+        (media,) = params
+        return 1 + rng.poisson(max(media - 1, 0), size=m)
+    if nombre == "proporcional":
+        (media,) = params
+        return np.maximum(1, np.rint(costes * media / costes.mean())).astype(np.int64)
+    raise ValueError(f"Distribución de demanda desconocida: {nombre}")
+
+
+def generar_instancia(tipo="calles", n_vertices=100, n_aristas=None, demanda=("uniforme", 1, 10),
+                      tareas_por_ruta=10, holgura=1.1, escala_coste=10, deposito="centro",
+                      semilla=None, nombre=None):
+    """
+    Genera una instancia con la misma estructura que retorna CarpLib._leer_dat.
+
+    demanda: ("uniforme", a, b) | ("poisson", media) | ("proporcional", media al coste)
+    tareas_por_ruta: tareas promedio que caben en un vehículo (fija CAPACIDAD).
+    holgura: capacidad total de la flota / demanda total (1.0 = flota justa).
+    n_aristas: por defecto todas las candidatas en grid/calles y 2·n_vertices en geometrico.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de grafo desconocido: {tipo}")
+    rng = np.random.default_rng(semilla)
+    if tipo == "grid":
+        posiciones, aristas, factor = _candidatas_grid(n_vertices, rng)
+    elif tipo == "calles":
+        posiciones, aristas, factor = _candidatas_calles(n_vertices, rng)
+    else:
+        objetivo = n_aristas or 2 * n_vertices
+        posiciones, aristas, factor = _candidatas_geometrico(
+            n_vertices, rng, vecinos=max(3, math.ceil(2 * objetivo / n_vertices) + 1))
+    n_total = len(posiciones)
+    if n_aristas is None:
+        n_aristas = len(aristas) if tipo != "geometrico" else 2 * n_vertices
+
+    elegidas, enlaces = _seleccionar(n_total, aristas, n_aristas, rng)
+    aristas = np.concatenate([aristas[elegidas], enlaces])
+    factor = np.concatenate([factor[elegidas], np.ones(len(enlaces))])
+    longitudes = np.linalg.norm(posiciones[aristas[:, 0]] - posiciones[aristas[:, 1]], axis=1)
+    costes = np.maximum(1, np.rint(longitudes * factor * escala_coste)).astype(np.int64)
+    demandas = _demandas(demanda, costes, rng)
+
+    capacidad = int(max(demandas.max(), round(demandas.mean() * tareas_por_ruta)))
+    vehiculos = max(1, math.ceil(demandas.sum() * holgura / capacidad))
+    if deposito == "centro":
+        dep = int(np.argmin(np.linalg.norm(posiciones - posiciones.mean(axis=0), axis=1)))
+    else:
+        dep = int(rng.integers(n_total))
+
+    return {
+        'NOMBRE': nombre or f"sintetica-{tipo}",
+        'COMENTARIO': f"instancia sintetica tipo {tipo}",
+        'VERTICES': n_total,
+        'ARISTAS_REQ': len(aristas),
+        'ARISTAS_NOREQ': 0,
+        'VEHICULOS': vehiculos,
+        'CAPACIDAD': capacidad,
+        'TIPO_COSTES_ARISTAS': "EXPLICITOS",
+        'COSTE_TOTAL_REQ': int(costes.sum()),
+        'LISTA_ARISTAS_REQ': [
+            {'arco': (int(u) + 1, int(v) + 1), 'coste': int(c), 'demanda': int(d)}
+            for (u, v), c, d in zip(aristas.tolist(), costes.tolist(), demandas.tolist())
+        ],
+        'DEPOSITO': dep + 1,
+    }
+
+
+def escribir_dat(datos, ruta):
+    """Escribe la instancia en formato .dat (el que lee CarpLib._leer_dat)."""
+    cabecera = ("NOMBRE", "COMENTARIO", "VERTICES", "ARISTAS_REQ", "ARISTAS_NOREQ",
+                "VEHICULOS", "CAPACIDAD", "TIPO_COSTES_ARISTAS", "COSTE_TOTAL_REQ",
+                "DURACION_MAXIMA", "FLOTA_ABIERTA")
+    with open(ruta, "w", encoding="utf-8") as f:
+        for clave in cabecera:
+            if clave in datos:
+                valor = int(datos[clave]) if clave == "FLOTA_ABIERTA" else datos[clave]
+                f.write(f"{clave} : {valor}\n")
+        f.write("LISTA_ARISTAS_REQ :\n")
+        f.writelines(f"( {it['arco'][0]}, {it['arco'][1]})   coste {it['coste']}   demanda {it['demanda']}\n"
+                     for it in datos['LISTA_ARISTAS_REQ'])
+        depositos = datos.get('DEPOSITOS') or [datos['DEPOSITO']]
+        f.write(f"DEPOSITO :   {' '.join(str(d) for d in depositos)}\n")
+    return ruta
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Genera una instancia CARP sintética (.dat)")
+    parser.add_argument("salida")
+    parser.add_argument("--tipo", choices=TIPOS, default="calles")
+    parser.add_argument("--vertices", type=int, default=100)
+    parser.add_argument("--aristas", type=int, default=None)
+    parser.add_argument("--tareas-por-ruta", type=float, default=10)
+    parser.add_argument("--holgura", type=float, default=1.1)
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args()
+    datos = generar_instancia(args.tipo, args.vertices, args.aristas, tareas_por_ruta=args.tareas_por_ruta,
+                              holgura=args.holgura, semilla=args.semilla)
+    escribir_dat(datos, args.salida)
+    print(f"{args.salida}: {datos['VERTICES']} vértices, {datos['ARISTAS_REQ']} aristas, "
+          f"{datos['VEHICULOS']} vehículos de capacidad {datos['CAPACIDAD']}")
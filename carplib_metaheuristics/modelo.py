@@ -3,37 +3,56 @@ import networkx as nx
 import numpy as np
 import os
 import random
-import copy
 import math
 import time
 import csv
 import pandas as pd
 from datetime import datetime
 
+from .busqueda_local import BusquedaLocal, VECINDARIOS
+from . import constructivas
+from .cache_rutas import CacheRutas
+from .evaluacion import EvaluadorRutas, depositos_de, validar_backend
+from .registro import RegistroConvergencia
+
 # =============================================================================
 # CLASE CarpLib: VERSIÓN FINAL INTEGRADA
 # =============================================================================
 
 class CarpLib:
-    def __init__(self):
+    def __init__(self, tam_cache=50000, backend=None):
         self.datos = None
         self.G = None
         self.m_dist = None
         self.alcanzables = []
+        self.analisis = None
         self.id_instancia = ""
+        self.cache_rutas = CacheRutas(tam_cache)
+        self.backend = None
+        self._evaluador = None
+        self.fijar_backend(backend)
+
+    @classmethod
+    def desde_datos(cls, datos, m_dist, id_instancia="", backend=None):
+        """
+        Crea un CarpLib a partir de datos y matriz de distancias ya calculados, sin grafo
+        ni impresión (p. ej. en procesos trabajadores que comparten m_dist).
+        """
+        carp = cls(backend=backend)
+        carp.datos = datos
+        carp.m_dist = m_dist
+        carp.id_instancia = id_instancia
+        carp.analizar_grafo()
+        return carp
 
     # --- TAREA 1: CARGA E IMPRESIÓN DE DATOS ---
     def cargar_instancia(self, ruta_archivo, algoritmo_dist="dijkstra"):
         print(f"\n{'='*80}\n[1] CARGANDO INSTANCIA: {ruta_archivo}\n{'='*80}")
         self.id_instancia = os.path.splitext(os.path.basename(ruta_archivo))[0]
         self.datos = self._leer_dat(ruta_archivo)
+        self.cache_rutas.limpiar()
         
-        self.G = nx.Graph()
-        self.G.add_nodes_from(range(1, self.datos['VERTICES'] + 1))
-        for item in self.datos['LISTA_ARISTAS_REQ']:
-            u, v = item['arco']
-            self.G.add_edge(u, v, weight=item['coste'], demanda=item['demanda'])
-        
+        self.construir_grafo()
         self.generar_matriz_distancias(algoritmo_dist)
         self.analizar_conectividad()
         
@@ -41,6 +60,13 @@ class CarpLib:
         for k, v in self.datos.items():
             if k != 'LISTA_ARISTAS_REQ': print(f"{k}: {v}")
 
+    def construir_grafo(self):
+        self.G = nx.Graph()
+        self.G.add_nodes_from(range(1, self.datos['VERTICES'] + 1))
+        for item in self.datos['LISTA_ARISTAS_REQ']:
+            u, v = item['arco']
+            self.G.add_edge(u, v, weight=item['coste'], demanda=item['demanda'])
+
     def _leer_dat(self, ruta):
         instancia = {}
         aristas = []
@@ -51,9 +77,11 @@ class CarpLib:
                 if not linea: continue
                 if "LISTA_ARISTAS_REQ" in linea: dentro_de_lista = True; continue
                 if "DEPOSITO" in linea:
+                    # Uno o varios depósitos; DEPOSITO es siempre el primero
                     dentro_de_lista = False
-                    m = re.search(r'\d+', linea.split(":")[-1])
-                    if m: instancia["DEPOSITO"] = int(m.group())
+                    depositos = [int(d) for d in re.findall(r'\d+', linea.split(":")[-1])]
+                    if depositos: instancia["DEPOSITO"] = depositos[0]
+                    if len(depositos) > 1: instancia["DEPOSITOS"] = depositos
                     continue
                 if dentro_de_lista:
                     n = re.findall(r'\d+', linea)
@@ -62,6 +90,11 @@ class CarpLib:
                 elif ":" in linea:
                     k, v = linea.split(":", 1)
                     v_l = re.sub(r'\(.*?\)', '', v).strip()
+                    if k.strip() == "DURACION_MAXIMA":
+                        # El límite de duración puede no ser entero (p. ej. 150.5)
+                        numero = re.search(r'\d+(?:\.\d*)?(?:[eE][-+]?\d+)?', v_l).group()
+                        instancia[k.strip()] = float(numero) if re.search(r'[.eE]', numero) else int(numero)
+                        continue
                     try: instancia[k.strip()] = int(re.search(r'\d+', v_l).group())
                     except: instancia[k.strip()] = v_l
         instancia["LISTA_ARISTAS_REQ"] = aristas
@@ -82,119 +115,301 @@ class CarpLib:
         print("\n--- OBJETO: MATRIZ DE DISTANCIAS (Muestra) ---")
         print(pd.DataFrame(self.m_dist).iloc[1:7, 1:7])
 
+    def analizar_grafo(self):
+        """
+        Análisis del grafo que se hace una sola vez al cargar la instancia y queda en
+        self.analisis: componentes conexas (unión-búsqueda vectorizada sobre las aristas),
+        grados, vértices y tareas alcanzables desde algún depósito (máscaras booleanas).
+        El resto del código (solución inicial, solucionadores, GUI) lee de aquí.
+        """
+        n = self.datos['VERTICES']
+        depositos = list(depositos_de(self.datos))
+        lista = self.datos['LISTA_ARISTAS_REQ']
+        aristas = np.array([it['arco'] for it in lista], dtype=np.int64).reshape(-1, 2)
+        u, v = aristas[:, 0], aristas[:, 1]
+
+        # Propagación de la etiqueta mínima con salto de punteros hasta estabilizar
+        etiqueta = np.arange(n + 1)
+        while True:
+            previa = etiqueta.copy()
+            minimo = np.minimum(etiqueta[u], etiqueta[v])
+            np.minimum.at(etiqueta, etiqueta[u], minimo)
+            np.minimum.at(etiqueta, etiqueta[v], minimo)
+            etiqueta = etiqueta[etiqueta]
+            if np.array_equal(etiqueta, previa):
+                break
+
+        vertices = etiqueta[1:]
+        raices, tamanos = np.unique(vertices, return_counts=True)
+        grados = np.bincount(np.concatenate([u, v]), minlength=n + 1)[1:]
+        pares = np.unique(np.sort(aristas, axis=1), axis=0) if len(aristas) else aristas
+        nodos_alcanzables = np.isin(vertices, etiqueta[depositos])
+        tareas_alcanzables = np.isin(etiqueta[u], etiqueta[depositos])
+
+        self.analisis = {
+            'n_nodos': n,
+            'n_aristas': len(pares),
+            'etiquetas': vertices,                      # componente de cada vértice 1..n
+            'n_componentes': len(raices),
+            'tam_componentes': np.sort(tamanos)[::-1],
+            'es_conexo': len(raices) == 1,
+            'grados': grados,
+            'grado_min': int(grados.min()) if n else 0,
+            'grado_max': int(grados.max()) if n else 0,
+            'grado_medio': float(grados.mean()) if n else 0.0,
+            'nodos_aislados': np.flatnonzero(grados == 0) + 1,
+            'nodos_alcanzables': nodos_alcanzables,     # máscara por vértice 1..n
+            'tareas_alcanzables': tareas_alcanzables,   # máscara por tarea 1..T
+        }
+        self.alcanzables = (np.flatnonzero(tareas_alcanzables) + 1).tolist()
+        return self.analisis
+
     def analizar_conectividad(self):
-        dep = self.datos.get('DEPOSITO', 1)
-        self.alcanzables = [i+1 for i, it in enumerate(self.datos['LISTA_ARISTAS_REQ']) 
-                           if self.m_dist[dep][it['arco'][0]] != np.inf]
+        a = self.analizar_grafo()
         print(f"\n--- OBJETO: CONECTIVIDAD ---\nTareas alcanzables: {len(self.alcanzables)}")
+        print(f"Componentes conexas: {a['n_componentes']} | Grado min/medio/max: "
+              f"{a['grado_min']}/{a['grado_medio']:.2f}/{a['grado_max']}")
 
     # --- TAREA 3: SOLUCIÓN INICIAL ---
-    def generar_solucion_inicial(self):
-        vehiculos, cap_max = self.datos['VEHICULOS'], self.datos['CAPACIDAD']
+    def configurar_flota(self, depositos=None, duracion_maxima=None, flota_abierta=False):
+        """
+        Fija la flota de la instancia cargada:
+         - depositos: lista de nodos depósito (None: solo DEPOSITO). Cada ruta sale y
+           vuelve al depósito que le da menor costo.
+         - duracion_maxima: costo máximo de cada ruta (servicio + deadheading); None sin límite.
+         - flota_abierta: VEHICULOS deja de limitar el número de rutas; la solución
+           inicial aleatoria y los operadores abren rutas nuevas cuando hace falta.
+        """
+        depositos = [int(d) for d in (depositos or [self.datos.get('DEPOSITO', 1)])]
+        self.datos['DEPOSITO'] = depositos[0]
+        self.datos.pop('DEPOSITOS', None)
+        if len(depositos) > 1: self.datos['DEPOSITOS'] = depositos
+        self.datos.pop('DURACION_MAXIMA', None)
+        if duracion_maxima is not None: self.datos['DURACION_MAXIMA'] = duracion_maxima
+        self.datos['FLOTA_ABIERTA'] = int(bool(flota_abierta))
+        # Cambia el costo de las rutas y las tareas alcanzables
+        self._evaluador = None
+        self.cache_rutas.limpiar()
+        self.analizar_grafo()
+
+    def limites(self):
+        """(capacidad, duración máxima de ruta o inf, flota abierta)."""
+        duracion = self.datos.get('DURACION_MAXIMA')
+        return (self.datos['CAPACIDAD'], float('inf') if duracion is None else duracion,
+                bool(self.datos.get('FLOTA_ABIERTA', 0)))
+
+    def generar_solucion_inicial(self, metodo="aleatoria", **parametros):
+        """
+        metodo="aleatoria": barajado y llenado secuencial de vehículos (sin flota abierta
+        puede dejar tareas fuera; con flota abierta se abren rutas nuevas).
+        metodo="path_scanning" | "augment_merge" | "grasp": heurísticas constructivas de
+        constructivas.py, que sirven todas las tareas alcanzables.
+        """
+        if metodo != "aleatoria":
+            if metodo not in constructivas.METODOS:
+                raise ValueError(f"Método de solución inicial desconocido: {metodo}")
+            return constructivas.METODOS[metodo](self, **parametros)
+        vehiculos = self.datos['VEHICULOS']
+        cap_max, dur_max, abierta = self.limites()
         solucion = [[] for _ in range(vehiculos)]
         tareas = self.alcanzables.copy()
         random.shuffle(tareas)
         v_idx, carga = 0, 0
         for t_id in tareas:
             dem = self.datos['LISTA_ARISTAS_REQ'][t_id-1]['demanda']
-            if carga + dem <= cap_max:
+            cabe = carga + dem <= cap_max
+            if cabe and dur_max != float('inf') and solucion[v_idx]:
+                cabe = self._recorrer_ruta(solucion[v_idx] + [t_id])[0] <= dur_max
+            if cabe:
                 solucion[v_idx].append(t_id); carga += dem
-            elif v_idx + 1 < vehiculos:
-                v_idx += 1; solucion[v_idx].append(t_id); carga = dem
+            elif v_idx + 1 < len(solucion) or abierta:
+                v_idx += 1
+                if v_idx == len(solucion): solucion.append([])
+                solucion[v_idx].append(t_id); carga = dem
         return solucion
 
+    def fijar_backend(self, backend=None):
+        """
+        Elige el núcleo de evaluación de rutas: "python", "numba" (si está instalado) o
+        None para el más rápido disponible. Todos dan los mismos resultados.
+        """
+        self.backend = validar_backend(backend)
+        self._evaluador = None
+
+    def preparar_evaluador(self):
+        """
+        Prepara el evaluador de la instancia y compila (o carga de la caché) sus núcleos,
+        para que ese costo no caiga dentro de una búsqueda con tiempo límite.
+        """
+        self._evaluador_actual().calentar()
+
+    def matriz_finita(self):
+        """Matriz de distancias sin inf (ver EvaluadorRutas.matriz_finita), común a toda la instancia."""
+        return self._evaluador_actual().matriz_finita()
+
+    def _recorrer_ruta(self, ruta, segmentos=None):
+        """Recorre la ruta desde el depósito; si se pasa `segmentos`, añade ahí los tramos de deadheading."""
+        return self._evaluador_actual().recorrer(ruta, segmentos)
+
+    def _evaluador_actual(self):
+        ev = self._evaluador
+        # Los arreglos del evaluador se preparan una vez por instancia (datos y m_dist)
+        if ev is None or ev.m_dist is not self.m_dist or ev.datos is not self.datos:
+            ev = self._evaluador = EvaluadorRutas(self.datos, self.m_dist, self.backend)
+        return ev
+
+    def calcular_costo_ruta(self, ruta):
+        """
+        Costo y carga de una ruta sin comprobar capacidad; costo inf si no hay camino.
+        Se consulta primero cache_rutas, indexada por la tupla de tareas de la ruta.
+        """
+        if not ruta: return 0, 0
+        clave = tuple(ruta)
+        entrada = self.cache_rutas.obtener(clave)
+        if entrada is None:
+            entrada = self._recorrer_ruta(ruta) + (None,)
+            self.cache_rutas.guardar(clave, entrada)
+        return entrada[0], entrada[1]
+
+    def calcular_costos_rutas(self, rutas):
+        """
+        [(costo, carga)] de varias rutas, como calcular_costo_ruta. Las que no están en la
+        caché se evalúan juntas en una sola llamada al núcleo de evaluación.
+        """
+        resultado, pendientes = [], {}
+        for i, ruta in enumerate(rutas):
+            if not ruta:
+                resultado.append((0, 0)); continue
+            clave = tuple(ruta)
+            entrada = self.cache_rutas.obtener(clave)
+            resultado.append(None if entrada is None else entrada[:2])
+            if entrada is None: pendientes.setdefault(clave, []).append(i)
+        if pendientes:
+            claves = list(pendientes)
+            for clave, evaluacion in zip(claves, self._evaluador_actual().recorrer_varias(claves)):
+                self.cache_rutas.guardar(clave, evaluacion + (None,))
+                for i in pendientes[clave]: resultado[i] = evaluacion
+        return resultado
+
     def calcular_costo_y_factibilidad(self, solucion):
-        cap_max, dep = self.datos['CAPACIDAD'], self.datos.get('DEPOSITO', 1)
+        cap_max, dur_max, _ = self.limites()
         costo_total = 0
-        for ruta in solucion:
-            if not ruta: continue
-            carga, pos = 0, dep
-            for t_id in ruta:
-                arco_info = self.datos['LISTA_ARISTAS_REQ'][t_id-1]
-                u, v = arco_info['arco']
-                carga += arco_info['demanda']
-                d_u, d_v = self.m_dist[pos][u], self.m_dist[pos][v]
-                if carga > cap_max or (d_u == np.inf and d_v == np.inf): return float('inf')
-                costo_total += min(d_u, d_v) + arco_info['coste']
-                pos = v if d_u <= d_v else u
-            if self.m_dist[pos][dep] == np.inf: return float('inf')
-            costo_total += self.m_dist[pos][dep]
+        for costo, carga in self.calcular_costos_rutas(solucion):
+            if carga > cap_max or costo > dur_max or costo == np.inf: return float('inf')
+            costo_total += costo
         return costo_total
 
+    def calcular_costo_penalizado(self, solucion, lambda_):
+        """
+        Evaluación penalizada para búsquedas que cruzan la región infactible:
+        retorna (costo + lambda_ · exceso, costo, exceso), donde el exceso es el de carga
+        más, si hay DURACION_MAXIMA, el de duración de cada ruta.
+        """
+        cap_max, dur_max, _ = self.limites()
+        con_duracion = dur_max != float('inf')
+        costo_total, exceso = 0, 0
+        for costo, carga in self.calcular_costos_rutas(solucion):
+            costo_total += costo
+            exceso += max(0, carga - cap_max)
+            if con_duracion: exceso += max(0, costo - dur_max)
+        return costo_total + lambda_ * exceso, costo_total, exceso
+
     def calcular_detalle_por_ruta(self, solucion):
         """
         Retorna costo total, costos por ruta, capacidad usada por ruta y arcos intermedios
         (deadheading) por ruta. Los arcos intermedios son los tramos recorridos sin servicio,
         usando la matriz de costes mínimos (camino más corto entre nodos).
         """
-        cap_max = self.datos['CAPACIDAD']
-        dep = self.datos.get('DEPOSITO', 1)
         costos_rutas = []
         capacidad_rutas = []
         segmentos_por_ruta = []  # list of list of (desde, hasta, distancia) deadhead
 
         for ruta in solucion:
-            costo_ruta = 0.0
-            carga_ruta = 0
-            segmentos = []
             if not ruta:
                 costos_rutas.append(0.0)
                 capacidad_rutas.append(0)
-                segmentos_por_ruta.append(segmentos)
+                segmentos_por_ruta.append([])
                 continue
 
-            pos = dep
-            for t_id in ruta:
-                arco_info = self.datos['LISTA_ARISTAS_REQ'][t_id - 1]
-                u, v = arco_info['arco']
-                d_u, d_v = self.m_dist[pos][u], self.m_dist[pos][v]
-                if d_u == np.inf and d_v == np.inf:
-                    costos_rutas.append(float('inf'))
-                    capacidad_rutas.append(carga_ruta + arco_info['demanda'])
-                    segmentos_por_ruta.append(segmentos)
-                    return float('inf'), costos_rutas, capacidad_rutas, segmentos_por_ruta
-                dist_dead = min(d_u, d_v)
-                nodo_llegada = v if d_u <= d_v else u
-                segmentos.append((int(pos), int(nodo_llegada), float(dist_dead)))
-                costo_ruta += dist_dead + arco_info['coste']
-                carga_ruta += arco_info['demanda']
-                pos = nodo_llegada
-
-            if self.m_dist[pos][dep] == np.inf:
-                costos_rutas.append(float('inf'))
-                capacidad_rutas.append(carga_ruta)
-                segmentos_por_ruta.append(segmentos)
-                return float('inf'), costos_rutas, capacidad_rutas, segmentos_por_ruta
-            segmentos.append((int(pos), int(dep), float(self.m_dist[pos][dep])))
-            costo_ruta += self.m_dist[pos][dep]
+            # Los tramos se guardan en la caché junto al costo la primera vez que se piden
+            clave = tuple(ruta)
+            entrada = self.cache_rutas.obtener(clave)
+            if entrada is None or entrada[2] is None:
+                segmentos = []
+                entrada = self._recorrer_ruta(ruta, segmentos) + (segmentos,)
+                self.cache_rutas.guardar(clave, entrada)
+            costo_ruta, carga_ruta, segmentos = entrada
             costos_rutas.append(costo_ruta)
             capacidad_rutas.append(carga_ruta)
-            segmentos_por_ruta.append(segmentos)
+            segmentos_por_ruta.append(list(segmentos))
+            if costo_ruta == float('inf'):
+                return float('inf'), costos_rutas, capacidad_rutas, segmentos_por_ruta
 
         costo_total = sum(costos_rutas)
         return costo_total, costos_rutas, capacidad_rutas, segmentos_por_ruta
 
     # --- TAREA 4: OPERADORES ---
-    def mutar(self, solucion, operador="swap", p_inter=0.7):
-        nueva = copy.deepcopy(solucion)
+    def mutar(self, solucion, operador="swap", p_inter=0.7, devolver_rutas=False):
+        """
+        Aplica un movimiento aleatorio. Solo se copian las rutas que cambian (las demás se
+        comparten con la solución original, que no se modifica). Con devolver_rutas=True
+        retorna además los índices de las rutas modificadas. Con flota abierta, si no queda
+        ninguna ruta vacía, insertion puede llevar la tarea a una ruta nueva al final.
+        """
+        nueva = list(solucion)
         activas = [i for i, r in enumerate(nueva) if r]
-        if not activas: return nueva, "Ninguno"
+        rutas = ()
+        if not activas: return (nueva, "Ninguno", rutas) if devolver_rutas else (nueva, "Ninguno")
         es_inter = (random.random() < p_inter) and (len(activas) >= 2)
         tipo = "Intra"
         if operador == "swap":
             r1, r2 = (random.sample(activas, 2) if es_inter else (random.choice(activas),)*2)
             if r1 != r2: tipo = "Inter"
+            rutas = (r1, r2) if r1 != r2 else (r1,)
+            for r in rutas: nueva[r] = list(nueva[r])
             i1, i2 = random.randrange(len(nueva[r1])), random.randrange(len(nueva[r2]))
             nueva[r1][i1], nueva[r2][i2] = nueva[r2][i2], nueva[r1][i1]
         elif operador == "insertion":
             r_orig = random.choice(activas)
+            nueva[r_orig] = list(nueva[r_orig])
             t = nueva[r_orig].pop(random.randrange(len(nueva[r_orig])))
+            if es_inter and len(activas) == len(nueva) and self.datos.get('FLOTA_ABIERTA'):
+                nueva.append([])
             r_dest = random.choice([i for i in range(len(nueva)) if i != r_orig]) if es_inter else r_orig
-            if r_orig != r_dest: tipo = "Inter"
+            if r_orig != r_dest: tipo = "Inter"; nueva[r_dest] = list(nueva[r_dest])
+            rutas = (r_orig, r_dest) if r_orig != r_dest else (r_orig,)
             nueva[r_dest].insert(random.randint(0, len(nueva[r_dest])), t)
         elif operador == "inversion":
             r_idx = random.choice(activas)
             if len(nueva[r_idx]) > 1:
+                nueva[r_idx] = list(nueva[r_idx]); rutas = (r_idx,)
                 a, b = random.sample(range(len(nueva[r_idx])), 2); i, j = min(a,b), max(a,b)
                 nueva[r_idx][i:j+1] = nueva[r_idx][i:j+1][::-1]
-        return nueva, tipo
\ No newline at end of file
+        return (nueva, tipo, rutas) if devolver_rutas else (nueva, tipo)
+
+    # --- TAREA 5: BÚSQUEDA LOCAL ---
+    def busqueda_local(self, solucion, vecindarios=VECINDARIOS, estrategia="best", max_movimientos=None,
+                       penalizacion=None):
+        """
+        Descenso sistemático sobre los vecindarios insertion, swap e inversion hasta un
+        óptimo local. estrategia="best" aplica el mejor movimiento de cada tarea;
+        estrategia="first" el primero que mejora. Con penalizacion=λ se permiten rutas
+        sobre capacidad y se minimiza costo + λ·exceso. Retorna (solución, costo).
+        """
+        bl = BusquedaLocal(self, vecindarios=vecindarios, estrategia=estrategia, penalizacion=penalizacion)
+        nueva = bl.ejecutar(solucion, max_movimientos=max_movimientos)
+        return nueva, self.calcular_costo_y_factibilidad(nueva)
+
+    # --- TAREA 6: REGISTRO DE RESULTADOS ---
+    def crear_registro(self, carpeta="resultados", formato="csv", etiqueta="", **parametros):
+        """
+        Abre un RegistroConvergencia en carpeta/<instancia>[_etiqueta]_<fecha>.<csv|bin>.
+        formato: "csv" o "binario" (los mismos nombres que RegistroConvergencia; el
+        binario se guarda con extensión .bin). Los parámetros adicionales (cada,
+        tam_lote, ...) se pasan al registro.
+        """
+        os.makedirs(carpeta, exist_ok=True)
+        sello = datetime.now().strftime("%Y%m%d_%H%M%S")
+        nombre = "_".join(p for p in (self.id_instancia, etiqueta, sello) if p)
+        extension = "csv" if formato == "csv" else "bin"
+        return RegistroConvergencia(os.path.join(carpeta, f"{nombre}.{extension}"), formato=formato, **parametros)
@@ -0,0 +1,166 @@
+"""
+Ejecución paralela: multiarranque independiente y modelo de islas con migración.
+
+Cada proceso trabajador reconstruye un CarpLib ligero (sin grafo) a partir de los
+datos de la instancia y de la matriz de distancias, que se comparte en memoria
+compartida de solo lectura en lugar de copiarse a cada proceso.
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .banco_soluciones import BancoSoluciones
+from .modelo import CarpLib
+from .recocido import RecocidoSimulado
+
+MODOS = ("islas", "multiarranque")
+
+
+def _trabajador(id_isla, datos, shm_nombre, forma, backend, semilla, tiempo_limite,
+                intervalo_migracion, entrada, salida, resultados, parametros):
+    shm = shared_memory.SharedMemory(name=shm_nombre)
+    try:
+        resultados.put(_buscar(id_isla, datos, shm.buf, forma, backend, semilla, tiempo_limite,
+                               intervalo_migracion, entrada, salida, parametros))
+    except Exception:
+        resultados.put((id_isla, None, float('inf'), 0))
+        raise
+    finally:
+        shm.close()
+
+
+def _buscar(id_isla, datos, buffer, forma, backend, semilla, tiempo_limite, intervalo_migracion,
+            entrada, salida, parametros):
+    m_dist = np.ndarray(forma, dtype=np.float64, buffer=buffer)
+    m_dist.flags.writeable = False
+    carp = CarpLib.desde_datos(datos, m_dist, backend=backend)
+    # Con la caché de Numba fría la compilación consumiría el tiempo de la búsqueda
+    carp.preparar_evaluador()
+    if salida is not None:
+        # Los migrantes pendientes no deben impedir que el proceso termine
+        salida.cancel_join_thread()
+
+    random.seed(semilla)
+    sa = RecocidoSimulado(carp, **parametros)
+    fin = time.perf_counter() + tiempo_limite
+    sa.iniciar()
+    while True:
+        restante = fin - time.perf_counter()
+        if restante <= 0:
+            break
+        sa.iterar(tiempo_limite=min(intervalo_migracion, restante))
+        if salida is None:
+            continue
+        # Migración en anillo: se envía la mejor y se recibe la de la isla anterior
+        try:
+            salida.put_nowait((sa.costo_mejor, sa.mejor))
+        except queue.Full:
+            pass
+        while True:
+            try:
+                costo, sol = entrada.get_nowait()
+            except queue.Empty:
+                break
+            sa.aceptar_externa(sol, costo)
+
+    if sa.busqueda_local:
+        sa.aceptar_externa(*carp.busqueda_local(sa.mejor))
+    return id_isla, sa.mejor, sa.costo_mejor, sa.iteracion
+
+
+def _recoger(procesos, resultados, espera=1.0):
+    """
+    Resultado de cada proceso, ordenados por id. Un proceso que termina sin enviarlo
+    (p. ej. muerto por una señal) cuenta como fallido en lugar de bloquear la espera.
+    """
+    por_proceso = {}
+    while len(por_proceso) < len(procesos):
+        try:
+            r = resultados.get(timeout=espera)
+            por_proceso[r[0]] = r
+            continue
+        except queue.Empty:
+            pass
+        terminados = [i for i, p in enumerate(procesos) if i not in por_proceso and p.exitcode is not None]
+        # Lo enviado antes de terminar ya está en la cola: se recoge antes de darlos por fallidos
+        while True:
+            try:
+                r = resultados.get(timeout=0.1)
+            except queue.Empty:
+                break
+            por_proceso[r[0]] = r
+        for i in terminados:
+            por_proceso.setdefault(i, (i, None, float('inf'), 0))
+    return [por_proceso[i] for i in sorted(por_proceso)]
+
+
+def resolver_paralelo(carp, n_procesos=None, modo="islas", tiempo_limite=60.0,
+                      intervalo_migracion=5.0, semilla=None, **parametros):
+    """
+    Lanza n_procesos búsquedas RecocidoSimulado sobre la instancia cargada en carp.
+
+    modo="multiarranque": arranques independientes, sin comunicación.
+    modo="islas": cada intervalo_migracion segundos cada isla envía su mejor solución
+    a la siguiente del anillo y adopta la recibida si mejora su solución actual.
+
+    Los trabajadores usan el mismo backend de evaluación que carp. Los parámetros
+    adicionales se pasan a RecocidoSimulado. Retorna un diccionario con
+    la mejor solución, su costo, el resultado de cada proceso y cuántas soluciones
+    finales distintas hay y su distancia media de pares rotos (ver BancoSoluciones).
+    Lanza RuntimeError si ningún proceso termina con una solución.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconocido: {modo}")
+    if carp.datos is None or carp.m_dist is None:
+        raise ValueError("Carga primero una instancia")
+    n_procesos = n_procesos or os.cpu_count() or 1
+    semilla = semilla if semilla is not None else random.randrange(2**32)
+
+    m_dist = np.ascontiguousarray(carp.m_dist, dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=m_dist.nbytes)
+    try:
+        np.ndarray(m_dist.shape, dtype=np.float64, buffer=shm.buf)[:] = m_dist
+        ctx = mp.get_context()
+        resultados = ctx.Queue()
+        colas = [ctx.Queue(maxsize=4) for _ in range(n_procesos)] if modo == "islas" else None
+        procesos = []
+        for i in range(n_procesos):
+            entrada = colas[i] if colas else None
+            salida = colas[(i + 1) % n_procesos] if colas and n_procesos > 1 else None
+            p = ctx.Process(
+                target=_trabajador,
+                args=(i, carp.datos, shm.name, m_dist.shape, carp.backend, semilla + i, tiempo_limite,
+                      intervalo_migracion, entrada, salida, resultados, parametros),
+                daemon=True,
+            )
+            p.start()
+            procesos.append(p)
+
+        por_proceso = _recoger(procesos, resultados)
+        for p in procesos:
+            p.join()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if all(sol is None for _, sol, _, _ in por_proceso):
+        codigos = ", ".join(str(p.exitcode) for p in procesos)
+        raise RuntimeError(f"Todos los procesos fallaron sin solución (códigos de salida: {codigos})")
+    _, mejor, costo, _ = min(por_proceso, key=lambda r: r[2])
+    banco = BancoSoluciones(carp, capacidad=len(por_proceso))
+    for _, sol, c, _ in por_proceso:
+        if sol is not None:
+            banco.agregar(sol, c)
+    return {
+        'mejor': mejor,
+        'costo': float(costo),
+        'distintas': len(banco),
+        'diversidad': banco.diversidad(),
+        'procesos': [{'id': i, 'costo': float(c), 'iteraciones': it} for i, _, c, it in por_proceso],
+    }
@@ -0,0 +1,148 @@
+"""
+Puntos de control (checkpoints) de búsquedas largas en un formato binario compacto.
+
+Solo se guarda el estado de la búsqueda (soluciones, escalares y estado del generador
+aleatorio `random`), nunca el CarpLib: la instancia se vuelve a cargar del .dat al
+reanudar. La escritura es atómica: se escribe un archivo temporal en la misma carpeta,
+se sincroniza con el disco y se renombra sobre el anterior, de modo que una interrupción
+a mitad de escritura deja intacto el último punto de control válido.
+
+Formato: MAGIA + contenido + crc32 del contenido. El contenido es una secuencia de
+escalares (struct, little-endian) y arreglos de NumPy con su longitud delante, y al final
+arreglos float64 con nombre para estado adicional (p. ej. el selector de operadores).
+"""
+
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+_MAGIA = b"CARPCKP1"
+
+# Escalares del estado, en orden: (clave, formato struct)
+_ESCALARES = (
+    ('iteracion', 'q'), ('temperatura', 'd'), ('temp_inicial', 'd'),
+    ('costo_actual', 'd'), ('costo_mejor', 'd'), ('exceso_actual', 'd'),
+    ('lambda_', 'd'), ('lambda_min', 'd'), ('lambda_max', 'd'),
+    ('factibles_periodo', 'q'), ('transcurrido', 'd'), ('posicion_registro', 'q'),
+    ('n_tareas', 'q'),
+)
+_FORMATO_ESCALARES = "<" + "".join(f for _, f in _ESCALARES)
+
+
+class _Escritor:
+    def __init__(self):
+        self.partes = []
+
+    def struct(self, formato, *valores):
+        self.partes.append(struct.pack(formato, *valores))
+
+    def texto(self, valor):
+        b = valor.encode("utf-8")
+        self.struct("<I", len(b))
+        self.partes.append(b)
+
+    def arreglo(self, valores, tipo):
+        a = np.asarray(valores, dtype=tipo)
+        self.struct("<Q", len(a))
+        self.partes.append(a.tobytes())
+
+    def solucion(self, solucion):
+        self.arreglo([len(r) for r in solucion], np.int32)
+        self.arreglo([t for r in solucion for t in r], np.int32)
+
+
+class _Lector:
+    def __init__(self, contenido):
+        self.contenido = contenido
+        self.pos = 0
+
+    def struct(self, formato):
+        valores = struct.unpack_from(formato, self.contenido, self.pos)
+        self.pos += struct.calcsize(formato)
+        return valores
+
+    def texto(self):
+        (n,) = self.struct("<I")
+        valor = self.contenido[self.pos:self.pos + n].decode("utf-8")
+        self.pos += n
+        return valor
+
+    def arreglo(self, tipo):
+        (n,) = self.struct("<Q")
+        a = np.frombuffer(self.contenido, dtype=tipo, count=n, offset=self.pos)
+        self.pos += n * np.dtype(tipo).itemsize
+        return a
+
+    def solucion(self):
+        largos = self.arreglo(np.int32).tolist()
+        tareas = self.arreglo(np.int32).tolist()
+        rutas, i = [], 0
+        for n in largos:
+            rutas.append(tareas[i:i + n])
+            i += n
+        return rutas
+
+
+def guardar_punto_control(ruta, estado):
+    """
+    Escribe `estado` (diccionario producido por RecocidoSimulado.estado()) en `ruta` de
+    forma atómica.
+    """
+    e = _Escritor()
+    e.struct(_FORMATO_ESCALARES, *(estado[k] for k, _ in _ESCALARES))
+    e.texto(estado['id_instancia'])
+    version, interno, gauss = estado['rng']
+    e.struct("<B?d", version, gauss is not None, 0.0 if gauss is None else gauss)
+    e.arreglo(interno, np.uint32)
+    e.solucion(estado['actual'])
+    e.solucion(estado['mejor'])
+    arreglos = estado.get('arreglos', {})
+    e.struct("<I", len(arreglos))
+    for nombre, valores in arreglos.items():
+        e.texto(nombre)
+        e.arreglo(valores, np.float64)
+    contenido = b"".join(e.partes)
+
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    fd, temporal = tempfile.mkstemp(prefix=".ckp_", dir=carpeta)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIA + contenido + struct.pack("<I", zlib.crc32(contenido)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return ruta
+
+
+def cargar_punto_control(ruta):
+    """Lee un punto de control y retorna el diccionario de estado."""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    if not datos.startswith(_MAGIA) or len(datos) < len(_MAGIA) + 4:
+        raise ValueError(f"{ruta} no es un punto de control")
+    contenido = datos[len(_MAGIA):-4]
+    (crc,) = struct.unpack("<I", datos[-4:])
+    if zlib.crc32(contenido) != crc:
+        raise ValueError(f"{ruta}: punto de control dañado (crc incorrecto)")
+
+    lector = _Lector(contenido)
+    estado = dict(zip((k for k, _ in _ESCALARES), lector.struct(_FORMATO_ESCALARES)))
+    estado['id_instancia'] = lector.texto()
+    version_rng, hay_gauss, gauss = lector.struct("<B?d")
+    interno = tuple(lector.arreglo(np.uint32).tolist())
+    estado['rng'] = (version_rng, interno, gauss if hay_gauss else None)
+    estado['actual'] = lector.solucion()
+    estado['mejor'] = lector.solucion()
+    estado['arreglos'] = {}
+    (n,) = lector.struct("<I")
+    for _ in range(n):
+        nombre = lector.texto()
+        estado['arreglos'][nombre] = lector.arreglo(np.float64).tolist()
+    return estado
@@ -0,0 +1,362 @@
+"""
+Recocido simulado (simulated annealing) sobre los operadores de mutación de CarpLib.
+"""
+
+import math
+import os
+import random
+import time
+
+from .puntos_control import cargar_punto_control, guardar_punto_control
+from .seleccion_operadores import SelectorOperadores
+
+OPERADORES = ("swap", "insertion", "inversion")
+
+# Movimientos aleatorios que se muestrean para calibrar la temperatura inicial
+MUESTRAS_CALIBRACION = 300
+# Probabilidad media de aceptar un movimiento que empeora a la temperatura inicial
+ACEPTACION_INICIAL = 0.01
+
+
+class RecocidoSimulado:
+    """
+    Búsqueda por recocido simulado: en cada iteración se aplica CarpLib.mutar con un
+    operador elegido al azar y se acepta la solución con el criterio de Metropolis.
+
+    Se usa por pasos (iniciar / iterar) para que otros componentes, como el modelo de
+    islas, puedan intercalar trabajo entre bloques de iteraciones.
+
+    El costo y la carga de cada ruta de la solución actual se mantienen por ruta, de modo
+    que cada movimiento solo recalcula las rutas que cambia. Con penalizacion=True se
+    aceptan soluciones sobre capacidad evaluándolas como costo + λ·exceso; λ se ajusta
+    cada periodo_lambda iteraciones para que la fracción de soluciones actuales
+    factibles se acerque a objetivo_factible. La mejor solución es siempre factible.
+    Si la instancia tiene DURACION_MAXIMA, el exceso de duración de cada ruta se suma al
+    de carga (con el mismo λ). Con flota abierta la solución puede ganar rutas.
+
+    Sin temp_inicial, la temperatura inicial se calibra con MUESTRAS_CALIBRACION
+    movimientos aleatorios desde la solución de partida, para que los que empeoran
+    se aceptan con probabilidad media ACEPTACION_INICIAL.
+
+    Si se pasa un RegistroConvergencia en `registro`, cada iteración se le envía
+    (él decide si la guarda según su muestreo).
+
+    Con adaptativo=True el operador y el tipo de movimiento (intra o inter-ruta) de cada
+    iteración los elige un SelectorOperadores (ruleta adaptativa); se puede pasar uno ya
+    configurado en `selector`, y sus estadísticas por operador quedan en
+    self.selector.estadisticas(). Sin selector se elige el operador al azar y p_inter fija
+    el tipo de movimiento.
+
+    Con `punto_control` (ruta de archivo) el estado se guarda cada intervalo_control
+    segundos durante iterar(); reanudar() lo recupera y la búsqueda continúa
+    exactamente igual que si no se hubiera interrumpido (con selector adaptativo, solo si
+    puntúa por uso y no por tiempo).
+    """
+
+    def __init__(self, carp, temp_inicial=None, enfriamiento=0.9995, temp_minima=1e-3,
+                 operadores=OPERADORES, p_inter=0.7, busqueda_local=True, metodo_inicial="grasp",
+                 penalizacion=False, lambda_inicial=None, factor_lambda=1.5, periodo_lambda=100,
+                 objetivo_factible=0.5, registro=None, punto_control=None, intervalo_control=600.0,
+                 adaptativo=False, selector=None):
+        self.carp = carp
+        self.temp_inicial = temp_inicial
+        self.enfriamiento = enfriamiento
+        self.temp_minima = temp_minima
+        self.operadores = tuple(operadores)
+        if not self.operadores:
+            raise ValueError("Indica al menos un operador")
+        for nombre in self.operadores:
+            if nombre not in OPERADORES:
+                raise ValueError(f"Operador desconocido: {nombre}")
+        self.p_inter = p_inter
+        self.busqueda_local = busqueda_local
+        self.metodo_inicial = metodo_inicial
+        self.penalizacion = penalizacion
+        self.lambda_ = lambda_inicial
+        self.factor_lambda = factor_lambda
+        self.periodo_lambda = periodo_lambda
+        self.objetivo_factible = objetivo_factible
+        self.cap_max, self.dur_max, _ = carp.limites()
+        self.registro = registro
+        self.punto_control = punto_control
+        self.intervalo_control = intervalo_control
+        if selector is None and adaptativo:
+            selector = SelectorOperadores(self.operadores)
+        self.selector = selector
+
+        self.actual = None
+        self.costo_actual = float('inf')
+        self.mejor = None
+        self.costo_mejor = float('inf')
+        self.temperatura = None
+        self.iteracion = 0
+        self.exceso_actual = 0
+        self._costos, self._cargas = [], []
+        self._factibles_periodo = 0
+        self._lambda_limites = (0.0, float('inf'))
+        self._t0 = time.perf_counter()
+
+    def iniciar(self, solucion=None):
+        """Fija la solución de partida (por defecto generar_solucion_inicial con metodo_inicial)."""
+        if solucion is None:
+            solucion = self.carp.generar_solucion_inicial(self.metodo_inicial)
+        if self.busqueda_local:
+            solucion, costo = self.carp.busqueda_local(solucion)
+        else:
+            costo = self.carp.calcular_costo_y_factibilidad(solucion)
+        self._fijar_actual(solucion)
+        self.mejor, self.costo_mejor = solucion, costo
+        if self.temp_inicial is None or self.lambda_ is None:
+            muestras = self._muestrear()
+            if self.temp_inicial is None:
+                self.temp_inicial = self._calibrar_temperatura(muestras)
+            if self.lambda_ is None:
+                self.lambda_ = self._calibrar_lambda(muestras)
+        # λ se mantiene dentro de dos órdenes de magnitud de su valor inicial
+        self._lambda_limites = (self.lambda_ / 100, self.lambda_ * 100)
+        self.temperatura = self.temp_inicial
+        self.iteracion = 0
+        self._t0 = time.perf_counter()
+
+    def _muestrear(self, n=MUESTRAS_CALIBRACION):
+        """(Δcosto, Δexceso) de n movimientos aleatorios desde la solución actual, sin aplicarlos."""
+        muestras = []
+        for _ in range(n):
+            operador = random.choice(self.operadores)
+            nueva, _, rutas = self.carp.mutar(self.actual, operador=operador, p_inter=self.p_inter,
+                                              devolver_rutas=True)
+            costo, exceso, _ = self._evaluar_cambio(nueva, rutas)
+            muestras.append((costo - self.costo_actual, exceso - self.exceso_actual))
+        return muestras
+
+    def _calibrar_temperatura(self, muestras, aceptacion=None):
+        """
+        Temperatura a la que la probabilidad de Metropolis media de los movimientos
+        muestreados que empeoran el costo (sin cambiar el exceso) es `aceptacion`
+        (ACEPTACION_INICIAL por defecto). Escala con el cambio de un movimiento, no con el
+        costo total. Los movimientos aleatorios desde un óptimo local empeoran casi
+        siempre y mucho, así que la aceptación objetivo es baja.
+        """
+        aceptacion = ACEPTACION_INICIAL if aceptacion is None else aceptacion
+        empeoran = [dc for dc, de in muestras if de == 0 and 0 < dc < float('inf')]
+        if not empeoran:
+            return 1.0
+
+        def media(t):
+            return sum(math.exp(-dc / t) for dc in empeoran) / len(empeoran)
+
+        # La aceptación media crece con t: bisección en escala logarítmica
+        bajo, alto = min(empeoran) / 100, max(empeoran) * 100
+        for _ in range(50):
+            t = math.sqrt(bajo * alto)
+            if media(t) < aceptacion:
+                bajo = t
+            else:
+                alto = t
+        return math.sqrt(bajo * alto)
+
+    @staticmethod
+    def _calibrar_lambda(muestras):
+        """
+        λ con el que el exceso medio que añade un movimiento muestreado pesa lo mismo que
+        el cambio de costo medio de un movimiento. Sin muestras que añadan exceso, una
+        unidad de exceso vale ese cambio de costo medio.
+        """
+        finitas = [(dc, de) for dc, de in muestras if abs(dc) < float('inf') and de < float('inf')]
+        cambios = [abs(dc) for dc, _ in finitas if dc != 0]
+        costo_medio = sum(cambios) / len(cambios) if cambios else 1.0
+        excesos = [de for _, de in finitas if de > 0]
+        if not excesos:
+            return costo_medio
+        return costo_medio / (sum(excesos) / len(excesos))
+
+    def _fijar_actual(self, solucion):
+        """Sustituye la solución actual recalculando costo y carga de todas sus rutas."""
+        detalle = self.carp.calcular_costos_rutas(solucion)
+        self._costos = [c for c, _ in detalle]
+        self._cargas = [q for _, q in detalle]
+        self.actual = solucion
+        self.costo_actual = sum(self._costos)
+        self.exceso_actual = sum(self._exceso(c, q) for c, q in detalle)
+
+    def _exceso(self, costo, carga):
+        """Exceso de carga de una ruta más, si hay duración máxima, su exceso de duración."""
+        exceso = max(0, carga - self.cap_max)
+        if self.dur_max != math.inf:
+            exceso += max(0, costo - self.dur_max)
+        return exceso
+
+    def _valor(self, costo, exceso):
+        """Valor que compara el criterio de aceptación (costo penalizado o inf si es infactible)."""
+        if exceso == 0:
+            return costo
+        return costo + self.lambda_ * exceso if self.penalizacion else float('inf')
+
+    def _ajustar_lambda(self):
+        fraccion = self._factibles_periodo / self.periodo_lambda
+        minimo, maximo = self._lambda_limites
+        if fraccion < self.objetivo_factible:
+            self.lambda_ = min(maximo, self.lambda_ * self.factor_lambda)
+        else:
+            self.lambda_ = max(minimo, self.lambda_ / self.factor_lambda)
+        self._factibles_periodo = 0
+
+    def aceptar_externa(self, solucion, costo):
+        """Incorpora una solución externa factible (p. ej. un migrante) si mejora la actual."""
+        if costo < self._valor(self.costo_actual, self.exceso_actual):
+            self._fijar_actual(solucion)
+            if costo < self.costo_mejor:
+                self.mejor, self.costo_mejor = solucion, costo
+
+    def _evaluar_cambio(self, nueva, rutas):
+        """
+        Costo y exceso de `nueva`, que solo difiere de la actual en `rutas`, junto con
+        [(costo, carga)] de esas rutas.
+        """
+        # Solo se evalúan las rutas modificadas
+        if len(nueva) > len(self._costos):
+            # Ruta nueva abierta por mutar (flota abierta)
+            self._costos.append(0); self._cargas.append(0)
+        cap_max, dur_max = self.cap_max, self.dur_max
+        nuevas = self.carp.calcular_costos_rutas([nueva[r] for r in rutas])
+        costo, exceso = self.costo_actual, self.exceso_actual
+        for r, (c, q) in zip(rutas, nuevas):
+            c0 = self._costos[r]
+            costo += c - c0
+            exceso += max(0, q - cap_max) - max(0, self._cargas[r] - cap_max)
+            if dur_max != math.inf:
+                exceso += max(0, c - dur_max) - max(0, c0 - dur_max)
+        return costo, exceso, nuevas
+
+    def paso(self):
+        selector = self.selector
+        if selector is not None:
+            brazo = selector.elegir()
+            nombre, operador, p_inter = selector.brazos[brazo]
+            t = time.perf_counter()
+        else:
+            operador = nombre = random.choice(self.operadores)
+            p_inter = self.p_inter
+        nueva, _, rutas = self.carp.mutar(self.actual, operador=operador, p_inter=p_inter,
+                                          devolver_rutas=True)
+        costo, exceso, nuevas = self._evaluar_cambio(nueva, rutas)
+        valor = self._valor(costo, exceso)
+        delta = valor - self._valor(self.costo_actual, self.exceso_actual)
+        aceptado = delta <= 0 or (valor != float('inf')
+                                  and random.random() < math.exp(-delta / self.temperatura))
+        mejora = False
+        if aceptado:
+            self.actual, self.costo_actual, self.exceso_actual = nueva, costo, exceso
+            for r, (c, q) in zip(rutas, nuevas):
+                self._costos[r], self._cargas[r] = c, q
+            if exceso == 0 and costo < self.costo_mejor:
+                self.mejor, self.costo_mejor = nueva, costo
+                mejora = True
+        if selector is not None:
+            selector.recompensar(brazo, delta, aceptado, mejora, time.perf_counter() - t)
+
+        self.iteracion += 1
+        if self.registro is not None:
+            self.registro.registrar(self.iteracion, time.perf_counter() - self._t0, self.costo_actual,
+                                    self.costo_mejor, nombre, aceptado, mejora)
+        if self.penalizacion:
+            self._factibles_periodo += self.exceso_actual == 0
+            if self.iteracion % self.periodo_lambda == 0:
+                self._ajustar_lambda()
+        self.temperatura *= self.enfriamiento
+        if self.temperatura < self.temp_minima:
+            # Recalentamiento: se reinicia el enfriamiento desde la mejor solución
+            self.temperatura = self.temp_inicial
+            self._fijar_actual(self.mejor)
+
+    def iterar(self, max_iter=None, tiempo_limite=None):
+        """Ejecuta pasos hasta agotar max_iter o tiempo_limite (segundos)."""
+        ahora = time.perf_counter()
+        fin = ahora + tiempo_limite if tiempo_limite is not None else None
+        proximo_control = ahora + self.intervalo_control if self.punto_control else float('inf')
+        n = 0
+        while (max_iter is None or n < max_iter) and (fin is None or time.perf_counter() < fin):
+            self.paso()
+            n += 1
+            if n & 255 == 0 and time.perf_counter() >= proximo_control:
+                self.guardar_punto_control()
+                proximo_control = time.perf_counter() + self.intervalo_control
+        return n
+
+    # --- Puntos de control ---
+    def estado(self):
+        """Estado de la búsqueda como diccionario de valores simples (ver puntos_control.py)."""
+        return {
+            'iteracion': self.iteracion,
+            'temperatura': self.temperatura,
+            'temp_inicial': self.temp_inicial,
+            'costo_actual': self.costo_actual,
+            'costo_mejor': self.costo_mejor,
+            'exceso_actual': self.exceso_actual,
+            'lambda_': self.lambda_,
+            'lambda_min': self._lambda_limites[0],
+            'lambda_max': self._lambda_limites[1],
+            'factibles_periodo': self._factibles_periodo,
+            'transcurrido': time.perf_counter() - self._t0,
+            'posicion_registro': self.registro.posicion() if self.registro is not None else -1,
+            'n_tareas': len(self.carp.datos['LISTA_ARISTAS_REQ']),
+            'id_instancia': self.carp.id_instancia,
+            'rng': random.getstate(),
+            'actual': self.actual,
+            'mejor': self.mejor,
+            'arreglos': ({f"selector.{k}": v for k, v in self.selector.estado().items()}
+                         if self.selector is not None else {}),
+        }
+
+    def restaurar(self, estado):
+        """Recupera un estado producido por estado() sobre la misma instancia."""
+        if estado['n_tareas'] != len(self.carp.datos['LISTA_ARISTAS_REQ']) or \
+                estado['id_instancia'] != self.carp.id_instancia:
+            raise ValueError(f"El punto de control es de otra instancia ({estado['id_instancia']})")
+        # Costo y carga por ruta se recalculan; el costo total se toma tal cual porque
+        # paso() lo actualiza de forma incremental
+        self._fijar_actual(estado['actual'])
+        self.costo_actual, self.exceso_actual = estado['costo_actual'], estado['exceso_actual']
+        self.mejor, self.costo_mejor = estado['mejor'], estado['costo_mejor']
+        self.iteracion = estado['iteracion']
+        self.temperatura = estado['temperatura']
+        self.temp_inicial = estado['temp_inicial']
+        self.lambda_ = estado['lambda_']
+        self._lambda_limites = (estado['lambda_min'], estado['lambda_max'])
+        self._factibles_periodo = estado['factibles_periodo']
+        self._t0 = time.perf_counter() - estado['transcurrido']
+        if self.registro is not None and estado['posicion_registro'] >= 0:
+            self.registro.truncar(estado['posicion_registro'])
+        if self.selector is not None:
+            prefijo = "selector."
+            arreglos = {k[len(prefijo):]: v for k, v in estado.get('arreglos', {}).items()
+                        if k.startswith(prefijo)}
+            if arreglos:
+                self.selector.restaurar(arreglos)
+        random.setstate(estado['rng'])
+
+    def guardar_punto_control(self, ruta=None):
+        return guardar_punto_control(ruta or self.punto_control, self.estado())
+
+    def reanudar(self, ruta=None):
+        self.restaurar(cargar_punto_control(ruta or self.punto_control))
+
+    def ejecutar(self, max_iter=None, tiempo_limite=None, solucion=None, reanudar=False):
+        """
+        Ejecución completa: inicia, itera y pule la mejor con búsqueda local. Retorna (mejor, costo).
+        Con reanudar=True y un punto_control existente se continúa desde él; max_iter
+        cuenta entonces las iteraciones ya hechas.
+        """
+        if max_iter is None and tiempo_limite is None:
+            raise ValueError("Indica max_iter o tiempo_limite")
+        if reanudar and self.punto_control and os.path.exists(self.punto_control):
+            self.reanudar()
+        else:
+            self.iniciar(solucion)
+        restantes = max(0, max_iter - self.iteracion) if max_iter is not None else None
+        self.iterar(max_iter=restantes, tiempo_limite=tiempo_limite)
+        if self.busqueda_local:
+            self.aceptar_externa(*self.carp.busqueda_local(self.mejor))
+        if self.registro is not None:
+            self.registro.vaciar()
+        return self.mejor, self.costo_mejor
@@ -0,0 +1,192 @@
+"""
+Registro de convergencia en flujo para ejecuciones largas.
+
+Las iteraciones se acumulan en un búfer y se escriben por lotes, en CSV o en un archivo
+binario columnar de solo anexado, de modo que la memoria no crece con la duración de la
+ejecución. cargar_registro lee cualquiera de los dos formatos como DataFrame de pandas.
+"""
+
+import csv
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS = ("iteracion", "tiempo", "costo_actual", "costo_mejor", "operador", "aceptado")
+
+# Formato binario: cabecera MAGIA y después bloques de dos tipos
+#  b"D" + uint16 largo + nombre utf-8    -> nuevo operador (código = orden de aparición)
+#  b"B" + uint32 n + columnas contiguas  -> lote de n registros
+_MAGIA = b"CARPLOG1"
+_TIPOS = (np.int64, np.float64, np.float64, np.float64, np.uint8, np.uint8)
+
+
+class RegistroConvergencia:
+    """
+    Sumidero de trazas de convergencia.
+
+    cada=k guarda una de cada k iteraciones, además de todas las que mejoran la mejor
+    solución; tam_lote es el número de registros que se acumulan antes de escribir.
+    Con anexar=True se continúa un archivo existente.
+    """
+
+    def __init__(self, ruta, formato=None, cada=1, tam_lote=1000, anexar=False):
+        if formato is None:
+            formato = "csv" if ruta.lower().endswith(".csv") else "binario"
+        if formato not in ("csv", "binario"):
+            raise ValueError(f"Formato de registro desconocido: {formato}")
+        self.ruta = ruta
+        self.formato = formato
+        self.cada = max(1, int(cada))
+        self.tam_lote = tam_lote
+        self._lote = []
+        self._codigos = {}
+
+        existe = anexar and os.path.exists(ruta) and os.path.getsize(ruta) > 0
+        if formato == "csv":
+            self._archivo = open(ruta, "a" if existe else "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._archivo)
+            if not existe:
+                self._csv.writerow(COLUMNAS)
+        else:
+            if existe:
+                # Se recuperan los códigos de operador ya escritos
+                self._codigos = {nombre: i for i, nombre in enumerate(_leer_binario(ruta)[1])}
+            self._archivo = open(ruta, "ab" if existe else "wb")
+            if not existe:
+                self._archivo.write(_MAGIA)
+
+    def registrar(self, iteracion, tiempo, costo_actual, costo_mejor, operador, aceptado,
+                  mejora=False):
+        """Añade una iteración si le toca según el muestreo (o si mejora la mejor solución)."""
+        if iteracion % self.cada and not mejora:
+            return
+        self._lote.append((iteracion, tiempo, costo_actual, costo_mejor, operador, aceptado))
+        if len(self._lote) >= self.tam_lote:
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe el lote pendiente en disco."""
+        if not self._lote:
+            return
+        if self.formato == "csv":
+            self._csv.writerows(
+                (it, f"{t:.6f}", ca, cm, op, int(ac)) for it, t, ca, cm, op, ac in self._lote)
+        else:
+            self._escribir_bloque()
+        self._archivo.flush()
+        self._lote = []
+
+    def _escribir_bloque(self):
+        columnas = list(zip(*self._lote))
+        codigos = []
+        for nombre in columnas[4]:
+            codigo = self._codigos.get(nombre)
+            if codigo is None:
+                codigo = self._codigos[nombre] = len(self._codigos)
+                nombre_b = str(nombre).encode("utf-8")
+                self._archivo.write(b"D" + struct.pack("<H", len(nombre_b)) + nombre_b)
+            codigos.append(codigo)
+        columnas[4] = codigos
+        self._archivo.write(b"B" + struct.pack("<I", len(self._lote)))
+        for valores, tipo in zip(columnas, _TIPOS):
+            self._archivo.write(np.asarray(valores, dtype=tipo).tobytes())
+
+    def posicion(self):
+        """Escribe el lote pendiente y retorna el tamaño actual del archivo en bytes."""
+        self.vaciar()
+        return self._archivo.tell()
+
+    def truncar(self, posicion):
+        """
+        Descarta lo escrito después de `posicion` (obtenida con posicion()), p. ej. al
+        reanudar desde un punto de control las iteraciones posteriores a él.
+        """
+        self._lote = []
+        self._archivo.flush()
+        self._archivo.truncate(posicion)
+        self._archivo.seek(0, os.SEEK_END)
+        if self.formato == "binario":
+            self._codigos = {nombre: i for i, nombre in enumerate(_leer_binario(self.ruta)[1])}
+
+    def cerrar(self):
+        self.vaciar()
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def _leer_binario(ruta):
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    if not contenido.startswith(_MAGIA):
+        raise ValueError(f"{ruta} no es un registro binario de convergencia")
+    nombres, bloques = [], []
+    pos = len(_MAGIA)
+    while pos < len(contenido):
+        tipo = contenido[pos:pos + 1]
+        if tipo == b"D":
+            (largo,) = struct.unpack_from("<H", contenido, pos + 1)
+            nombres.append(contenido[pos + 3:pos + 3 + largo].decode("utf-8"))
+            pos += 3 + largo
+        elif tipo == b"B":
+            (n,) = struct.unpack_from("<I", contenido, pos + 1)
+            pos += 5
+            bloque = []
+            for t in _TIPOS:
+                tam = n * np.dtype(t).itemsize
+                if pos + tam > len(contenido):
+                    return bloques, nombres  # lote truncado (ejecución interrumpida)
+                bloque.append(np.frombuffer(contenido, dtype=t, count=n, offset=pos))
+                pos += tam
+            bloques.append(bloque)
+        else:
+            break  # final truncado
+    return bloques, nombres
+
+
+def cargar_registro(ruta):
+    """Lee un registro CSV o binario como DataFrame con las columnas de COLUMNAS."""
+    with open(ruta, "rb") as f:
+        es_binario = f.read(len(_MAGIA)) == _MAGIA
+    if not es_binario:
+        df = pd.read_csv(ruta)
+        df["aceptado"] = df["aceptado"].astype(bool)
+        return df
+    bloques, nombres = _leer_binario(ruta)
+    if not bloques:
+        return pd.DataFrame(columns=list(COLUMNAS))
+    columnas = [np.concatenate(c) for c in zip(*bloques)]
+    df = pd.DataFrame(dict(zip(COLUMNAS, columnas)))
+    df["operador"] = np.array(nombres, dtype=object)[df["operador"].to_numpy()]
+    df["aceptado"] = df["aceptado"].astype(bool)
+    return df
+
+
+def tabla_comparativa(registros):
+    """
+    Resume varias trazas ({nombre: ruta o DataFrame}) en una tabla: mejor costo final,
+    iteraciones, tiempo total y tiempo e iteración en que se alcanzó la mejor solución.
+    """
+    filas = []
+    for nombre, reg in registros.items():
+        df = cargar_registro(reg) if isinstance(reg, str) else reg
+        if df.empty:
+            continue
+        final = df["costo_mejor"].iloc[-1]
+        primera = df.index[df["costo_mejor"] == final][0]
+        filas.append({
+            "ejecucion": nombre,
+            "mejor_costo": final,
+            "iteraciones": int(df["iteracion"].iloc[-1]),
+            "tiempo_total": float(df["tiempo"].iloc[-1]),
+            "iteracion_mejor": int(df["iteracion"].loc[primera]),
+            "tiempo_mejor": float(df["tiempo"].loc[primera]),
+            "tasa_aceptacion": float(df["aceptado"].mean()),
+        })
+    return pd.DataFrame(filas).set_index("ejecucion") if filas else pd.DataFrame()
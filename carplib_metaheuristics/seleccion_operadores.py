@@ -0,0 +1,149 @@
+"""
+Selección adaptativa de operadores de mutación (estilo ALNS, ruleta con pesos).
+
+Cada "brazo" es un operador de CarpLib.mutar junto con el tipo de movimiento: swap e
+insertion en versión intra-ruta e inter-ruta, inversion solo intra-ruta. Cada uso se
+puntúa según su resultado (nueva mejor global, mejora de la actual, aceptado empeorando;
+los movimientos que dejan el valor igual no puntúan) y cada `periodo` usos los pesos se actualizan con la puntuación obtenida por
+segundo de cómputo en ese segmento, de modo que los operadores que más aportan por
+unidad de tiempo en la instancia concreta reciben más iteraciones. Cada brazo conserva
+una probabilidad mínima para que pueda recuperarse si cambia la fase de la búsqueda.
+"""
+
+import random
+
+# Puntuaciones de Ropke y Pisinger (2006)
+PUNTOS_MEJOR_GLOBAL = 33
+PUNTOS_MEJORA = 9
+PUNTOS_ACEPTADO = 13
+
+
+def brazos_de(operadores):
+    """(nombre, operador, p_inter) de cada brazo para una lista de operadores de mutar."""
+    brazos = []
+    for op in operadores:
+        brazos.append((f"{op}-intra", op, 0.0))
+        if op != "inversion":
+            brazos.append((f"{op}-inter", op, 1.0))
+    return brazos
+
+
+class SelectorOperadores:
+    """
+    Ruleta adaptativa sobre los brazos de `operadores`.
+
+    periodo: usos entre actualizaciones de pesos.
+    reaccion: peso de la puntuación del último segmento frente al peso anterior (ρ).
+    prob_minima: probabilidad mínima de cada brazo.
+    por_tiempo: puntuación por segundo (True) o por uso (False). Con False la selección
+        depende solo de la semilla, lo que permite repetir ejecuciones exactamente.
+    """
+
+    def __init__(self, operadores=("swap", "insertion", "inversion"), periodo=100, reaccion=0.2,
+                 prob_minima=0.05, por_tiempo=True):
+        self.brazos = brazos_de(operadores)
+        n = len(self.brazos)
+        if prob_minima * n >= 1:
+            raise ValueError("prob_minima demasiado alta para el número de brazos")
+        self.periodo = periodo
+        self.reaccion = reaccion
+        self.prob_minima = prob_minima
+        self.por_tiempo = por_tiempo
+
+        self.pesos = [1.0] * n
+        self._puntos = [0.0] * n       # segmento actual
+        self._usos = [0] * n
+        self._tiempos = [0.0] * n
+        self._usos_totales = 0
+        self._actualizar_probabilidades()
+        # Acumulados de toda la ejecución
+        self.usos = [0] * n
+        self.aceptados = [0] * n
+        self.mejoras = [0] * n
+        self.mejores_globales = [0] * n
+        self.tiempo = [0.0] * n
+
+    def _actualizar_probabilidades(self):
+        total = sum(self.pesos)
+        libre = 1 - self.prob_minima * len(self.pesos)
+        acumulada, self._acumuladas = 0.0, []
+        for w in self.pesos:
+            acumulada += self.prob_minima + libre * w / total
+            self._acumuladas.append(acumulada)
+        self.probabilidades = [b - a for a, b in zip([0.0] + self._acumuladas[:-1], self._acumuladas)]
+
+    def elegir(self):
+        """Índice del brazo elegido por ruleta."""
+        x = random.random() * self._acumuladas[-1]
+        for i, a in enumerate(self._acumuladas):
+            if x < a:
+                return i
+        return len(self._acumuladas) - 1
+
+    def recompensar(self, i, delta, aceptado, mejor_global, tiempo):
+        """
+        Registra un uso del brazo i: delta es el cambio de valor de la solución actual
+        propuesto por el movimiento y tiempo lo que tardó, en segundos.
+        """
+        mejora = aceptado and delta < 0
+        puntos = (PUNTOS_MEJOR_GLOBAL if mejor_global else PUNTOS_MEJORA if mejora
+                  else PUNTOS_ACEPTADO if aceptado and delta > 0 else 0)
+        self._puntos[i] += puntos
+        self._usos[i] += 1
+        self._tiempos[i] += tiempo
+        self.usos[i] += 1
+        self.aceptados[i] += aceptado
+        self.mejoras[i] += mejora
+        self.mejores_globales[i] += mejor_global
+        self.tiempo[i] += tiempo
+        self._usos_totales += 1
+        if self._usos_totales % self.periodo == 0:
+            self._actualizar_pesos()
+
+    def _actualizar_pesos(self):
+        usados = [i for i, u in enumerate(self._usos) if u]
+        divisor = self._tiempos if self.por_tiempo else self._usos
+        tasas = {i: self._puntos[i] / divisor[i] if divisor[i] > 0 else 0.0 for i in usados}
+        media = sum(tasas.values()) / len(tasas) if tasas else 0.0
+        if media > 0:
+            # Tasas normalizadas por su media: los pesos no dependen de la escala de tiempo
+            for i, tasa in tasas.items():
+                self.pesos[i] = (1 - self.reaccion) * self.pesos[i] + self.reaccion * tasa / media
+            self._actualizar_probabilidades()
+        n = len(self.pesos)
+        self._puntos, self._usos, self._tiempos = [0.0] * n, [0] * n, [0.0] * n
+
+    # --- Estado (puntos de control) ---
+    _ESTADO = ('pesos', '_puntos', '_usos', '_tiempos', 'usos', 'aceptados', 'mejoras',
+               'mejores_globales', 'tiempo')
+
+    def estado(self):
+        """Pesos, segmento en curso y acumulados como listas de números (una por atributo)."""
+        estado = {nombre: list(getattr(self, nombre)) for nombre in self._ESTADO}
+        estado['usos_totales'] = [self._usos_totales]
+        return estado
+
+    def restaurar(self, estado):
+        for nombre in self._ESTADO:
+            valores = estado[nombre]
+            enteros = isinstance(getattr(self, nombre)[0], int)
+            setattr(self, nombre, [int(v) if enteros else float(v) for v in valores])
+        self._usos_totales = int(estado['usos_totales'][0])
+        self._actualizar_probabilidades()
+
+    def estadisticas(self):
+        """Una fila por brazo: usos, aceptados, mejoras, mejores globales, tiempo y probabilidad."""
+        filas = []
+        for i, (nombre, _, _) in enumerate(self.brazos):
+            filas.append({
+                'operador': nombre,
+                'usos': self.usos[i],
+                'aceptados': self.aceptados[i],
+                'mejoras': self.mejoras[i],
+                'mejores_globales': self.mejores_globales[i],
+                'tiempo': self.tiempo[i],
+                'us_por_uso': 1e6 * self.tiempo[i] / self.usos[i] if self.usos[i] else 0.0,
+                'peso': self.pesos[i],
+                'probabilidad': self.probabilidades[i],
+            })
+        return filas
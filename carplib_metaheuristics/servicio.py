@@ -0,0 +1,546 @@
+"""
+Servicio local de resolución por lotes sobre asyncio.
+
+Recibe trabajos como líneas JSON, por un socket TCP local o por la entrada estándar, y
+los resuelve con RecocidoSimulado en un grupo acotado de procesos. Las respuestas son
+también líneas JSON que se emiten a medida que ocurren (en cola, iniciado, progreso,
+resultado o error), de modo que un cliente puede enviar muchas instancias por la misma
+conexión y recoger los resultados conforme terminan.
+
+Petición:
+    {"id": "zona-3", "instancia": "ruta/al/archivo.dat", "tiempo_limite": 10,
+     "semilla": 1, "parametros": {"enfriamiento": 0.999}}
+    En lugar de "instancia" se puede enviar "datos" con la estructura de
+    CarpLib._leer_dat. {"comando": "estadisticas"} devuelve el estado del servicio.
+    "parametros" solo admite los de PARAMETROS_PERMITIDOS: los que escriben archivos
+    (punto_control, registro) o reciben objetos no se aceptan desde la red. Los valores
+    se comprueban antes de encolar el trabajo.
+
+Las instancias cargadas se mantienen en una LRU: su matriz de distancias se calcula una
+sola vez (en un proceso del grupo) y queda en memoria compartida, como en paralelo.py.
+Cada trabajador conserva además su propio CarpLib por instancia, con la caché de rutas
+caliente, para los trabajos siguientes sobre la misma instancia.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from .constructivas import METODOS
+from .evaluacion import backends_disponibles, validar_backend
+from .modelo import CarpLib
+from .recocido import OPERADORES, RecocidoSimulado
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+
+
+
+def _es_numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor)
+
+
+def _es_entero(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+# Parámetros de RecocidoSimulado que un cliente puede fijar en "parametros":
+# nombre -> (descripción de los valores válidos, comprobación)
+_REGLAS_PARAMETROS = {
+    "temp_inicial": ("un número > 0 o null", lambda v: v is None or _es_numero(v) and v > 0),
+    "enfriamiento": ("un número en (0, 1)", lambda v: _es_numero(v) and 0 < v < 1),
+    "temp_minima": ("un número >= 0", lambda v: _es_numero(v) and v >= 0),
+    "operadores": (f"una lista no vacía de {', '.join(OPERADORES)}",
+                   lambda v: isinstance(v, list) and len(v) > 0 and all(op in OPERADORES for op in v)),
+    "p_inter": ("un número en [0, 1]", lambda v: _es_numero(v) and 0 <= v <= 1),
+    "busqueda_local": ("true o false", lambda v: isinstance(v, bool)),
+    "metodo_inicial": (f"uno de aleatoria, {', '.join(METODOS)}",
+                       lambda v: v == "aleatoria" or v in METODOS),
+    "penalizacion": ("true o false", lambda v: isinstance(v, bool)),
+    "lambda_inicial": ("un número > 0 o null", lambda v: v is None or _es_numero(v) and v > 0),
+    "factor_lambda": ("un número >= 1", lambda v: _es_numero(v) and v >= 1),
+    "periodo_lambda": ("un entero >= 1", lambda v: _es_entero(v) and v >= 1),
+    "objetivo_factible": ("un número en [0, 1]", lambda v: _es_numero(v) and 0 <= v <= 1),
+    "adaptativo": ("true o false", lambda v: isinstance(v, bool)),
+}
+PARAMETROS_PERMITIDOS = frozenset(_REGLAS_PARAMETROS)
+
+
+def _validar_peticion(peticion):
+    """Mensaje de error de una petición de trabajo, o None si se puede encolar."""
+    if "instancia" not in peticion and "datos" not in peticion:
+        return "Falta 'instancia' o 'datos'"
+    tiempo_limite = peticion.get("tiempo_limite")
+    if tiempo_limite is not None and not (_es_numero(tiempo_limite) and tiempo_limite > 0):
+        return "'tiempo_limite' debe ser un número > 0"
+    semilla = peticion.get("semilla")
+    if semilla is not None and not _es_entero(semilla):
+        return "'semilla' debe ser un entero"
+    parametros = peticion.get("parametros", {})
+    if not isinstance(parametros, dict):
+        return "'parametros' debe ser un objeto"
+    no_permitidos = sorted(set(parametros) - PARAMETROS_PERMITIDOS)
+    if no_permitidos:
+        return f"Parámetros no permitidos: {', '.join(no_permitidos)}"
+    for nombre, valor in parametros.items():
+        descripcion, valido = _REGLAS_PARAMETROS[nombre]
+        if not valido(valor):
+            return f"'{nombre}' debe ser {descripcion}"
+    return None
+
+# ---------------------------------------------------------------------------
+# Lado del proceso trabajador
+# ---------------------------------------------------------------------------
+_progreso = None
+_carps = OrderedDict()          # nombre de memoria compartida -> (shm, CarpLib)
+_max_carps = 8
+_backend = None
+
+
+def _iniciar_trabajador(cola_progreso, max_instancias, backend):
+    global _progreso, _max_carps, _backend
+    _progreso = cola_progreso
+    _max_carps = max_instancias
+    _backend = backend
+    # CarpLib imprime al cargar; en modo stdin eso rompería el protocolo
+    sys.stdout = open(os.devnull, "w")
+
+
+def _cargar(origen):
+    """Lee la instancia y calcula su matriz de distancias. Retorna (datos, m_dist, id)."""
+    carp = CarpLib()
+    if "instancia" in origen:
+        carp.cargar_instancia(origen["instancia"], origen.get("algoritmo_dist", "dijkstra"))
+    else:
+        carp.datos = _normalizar_datos(origen["datos"])
+        carp.construir_grafo()
+        carp.generar_matriz_distancias(origen.get("algoritmo_dist", "dijkstra"))
+        carp.id_instancia = carp.datos.get('NOMBRE', "")
+    return carp.datos, np.ascontiguousarray(carp.m_dist, dtype=np.float64), carp.id_instancia
+
+
+def _normalizar_datos(datos):
+    """Los arcos llegan de JSON como listas; CarpLib los usa como tuplas."""
+    datos = dict(datos)
+    datos['LISTA_ARISTAS_REQ'] = [
+        {'arco': tuple(it['arco']), 'coste': it['coste'], 'demanda': it['demanda']}
+        for it in datos['LISTA_ARISTAS_REQ']
+    ]
+    return datos
+
+
+def _carp_trabajador(datos, shm_nombre, forma, id_instancia):
+    """CarpLib de la instancia en este proceso, reutilizado entre trabajos (LRU)."""
+    entrada = _carps.get(shm_nombre)
+    if entrada is not None:
+        _carps.move_to_end(shm_nombre)
+        return entrada[1]
+    shm = shared_memory.SharedMemory(name=shm_nombre)
+    m_dist = np.ndarray(forma, dtype=np.float64, buffer=shm.buf)
+    m_dist.flags.writeable = False
+    carp = CarpLib.desde_datos(datos, m_dist, id_instancia, backend=_backend)
+    # Compila los núcleos antes de que empiece a contar el tiempo límite del trabajo
+    carp.preparar_evaluador()
+    _carps[shm_nombre] = (shm, carp)
+    while len(_carps) > _max_carps:
+        viejo_shm, viejo = _carps.popitem(last=False)[1]
+        del viejo
+        viejo_shm.close()
+    return carp
+
+
+def _resolver(id_interno, datos, shm_nombre, forma, id_instancia, tiempo_limite, semilla,
+              parametros, intervalo_progreso):
+    carp = _carp_trabajador(datos, shm_nombre, forma, id_instancia)
+    random.seed(semilla)
+    t0 = time.perf_counter()
+    fin = t0 + tiempo_limite
+    sa = RecocidoSimulado(carp, **parametros)
+    sa.iniciar()
+    while True:
+        restante = fin - time.perf_counter()
+        if restante <= 0:
+            break
+        sa.iterar(tiempo_limite=min(intervalo_progreso, restante))
+        _progreso.put((id_interno, sa.iteracion, float(sa.costo_mejor), time.perf_counter() - t0))
+    if sa.busqueda_local:
+        sa.aceptar_externa(*carp.busqueda_local(sa.mejor))
+    return {
+        'costo': float(sa.costo_mejor),
+        'solucion': sa.mejor,
+        'iteraciones': sa.iteracion,
+        'tiempo': time.perf_counter() - t0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Lado del servicio
+# ---------------------------------------------------------------------------
+class _Instancia:
+    """Instancia cargada: datos y matriz de distancias en memoria compartida."""
+
+    def __init__(self, datos, m_dist, id_instancia):
+        self.datos = datos
+        self.id_instancia = id_instancia
+        self.forma = m_dist.shape
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, m_dist.nbytes))
+        np.ndarray(m_dist.shape, dtype=np.float64, buffer=self.shm.buf)[:] = m_dist
+        self.en_uso = 0
+
+    def liberar(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _clave(peticion):
+    """Clave de la LRU: ruta y versión del archivo, o hash del contenido enviado."""
+    algoritmo = peticion.get("algoritmo_dist", "dijkstra")
+    if "instancia" in peticion:
+        ruta = os.path.abspath(peticion["instancia"])
+        st = os.stat(ruta)
+        return ("ruta", ruta, st.st_mtime_ns, st.st_size, algoritmo)
+    contenido = json.dumps(peticion["datos"], sort_keys=True).encode("utf-8")
+    return ("datos", hashlib.sha1(contenido).hexdigest(), algoritmo)
+
+
+class ServicioCarp:
+    """
+    Cola de trabajos con n_procesos despachadores sobre un ProcessPoolExecutor.
+
+    max_instancias: instancias que se mantienen cargadas (LRU).
+    max_pendientes: trabajos en cola; si se llena, los nuevos se rechazan con error.
+    intervalo_progreso: segundos entre mensajes de progreso de cada trabajo.
+    backend: núcleo de evaluación de los trabajadores (ver CarpLib.fijar_backend).
+    """
+
+    def __init__(self, n_procesos=None, max_instancias=8, max_pendientes=1000,
+                 intervalo_progreso=1.0, tiempo_limite=10.0, backend=None):
+        self.n_procesos = n_procesos or os.cpu_count() or 1
+        self.backend = validar_backend(backend)
+        self.max_instancias = max_instancias
+        self.max_pendientes = max_pendientes
+        self.intervalo_progreso = intervalo_progreso
+        self.tiempo_limite = tiempo_limite
+
+        self._instancias = OrderedDict()
+        self._cargando = {}
+        self._activos = {}             # id interno -> (id del cliente, notificar)
+        self._ids = itertools.count(1)
+        self._pool = None
+        self._cola = None
+        self._despachadores = []
+        self._hilo = None
+        self._ctx = mp.get_context()
+        self._cola_progreso = None
+        self.completados = 0
+        self.fallidos = 0
+        self.aciertos_instancia = 0
+        self.cargas_instancia = 0
+
+    async def iniciar(self):
+        self._loop = asyncio.get_running_loop()
+        self._cola = asyncio.Queue(maxsize=self.max_pendientes)
+        self._cola_progreso = self._ctx.Queue()
+        # Los trabajadores deben compartir el rastreador de recursos del servicio; si no,
+        # cada uno borraría al terminar la memoria compartida a la que se conectó
+        resource_tracker.ensure_running()
+        self._pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.n_procesos, mp_context=self._ctx, initializer=_iniciar_trabajador,
+            initargs=(self._cola_progreso, self.max_instancias, self.backend))
+        # Se arrancan los trabajadores antes de aceptar conexiones: un proceso creado con
+        # fork después heredaría los sockets abiertos y el cliente no vería el cierre
+        await asyncio.gather(*(self._loop.run_in_executor(self._pool, os.getpid)
+                               for _ in range(self.n_procesos)))
+        self._hilo = threading.Thread(target=self._leer_progreso, daemon=True)
+        self._hilo.start()
+        self._despachadores = [asyncio.create_task(self._despachar()) for _ in range(self.n_procesos)]
+
+    async def cerrar(self):
+        """Espera a que terminen los trabajos en cola y libera procesos y memoria compartida."""
+        await self._cola.join()
+        for tarea in self._despachadores:
+            tarea.cancel()
+        await asyncio.gather(*self._despachadores, return_exceptions=True)
+        self._pool.shutdown()
+        self._cola_progreso.put(None)
+        self._hilo.join()
+        for instancia in self._instancias.values():
+            instancia.liberar()
+        self._instancias.clear()
+
+    async def __aenter__(self):
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.cerrar()
+
+    # --- Recepción de peticiones ---
+    def enviar(self, peticion, notificar):
+        """
+        Encola una petición ya decodificada. notificar(mensaje) recibe cada respuesta
+        (diccionario) del trabajo y se llama desde el bucle de eventos.
+        """
+        if not isinstance(peticion, dict):
+            notificar({'evento': 'error', 'mensaje': "La petición debe ser un objeto JSON"})
+            return
+        if peticion.get("comando") == "estadisticas":
+            notificar({'evento': 'estadisticas', **self.estadisticas()})
+            return
+        # Los trabajos se siguen por un id interno: el del cliente puede repetirse entre conexiones
+        id_interno = next(self._ids)
+        id_trabajo = peticion.get("id", id_interno)
+        error = _validar_peticion(peticion)
+        if error is not None:
+            notificar({'id': id_trabajo, 'evento': 'error', 'mensaje': error})
+            return
+        try:
+            self._cola.put_nowait((id_interno, id_trabajo, peticion, notificar))
+        except asyncio.QueueFull:
+            notificar({'id': id_trabajo, 'evento': 'error', 'mensaje': "Cola llena"})
+            return
+        notificar({'id': id_trabajo, 'evento': 'en_cola', 'posicion': self._cola.qsize()})
+
+    async def atender(self, lector, notificar):
+        """Lee líneas JSON de lector hasta EOF y espera a que terminen sus trabajos."""
+        pendientes = []
+        while True:
+            linea = await lector.readline()
+            if not linea:
+                break
+            if not linea.strip():
+                continue
+            try:
+                peticion = json.loads(linea)
+            except json.JSONDecodeError as e:
+                notificar({'evento': 'error', 'mensaje': f"JSON inválido: {e}"})
+                continue
+            if not isinstance(peticion, dict):
+                notificar({'evento': 'error', 'mensaje': "La petición debe ser un objeto JSON"})
+                continue
+            terminado = self._loop.create_future()
+            pendientes.append(terminado)
+            self.enviar(peticion, _al_terminar(notificar, terminado))
+        await asyncio.gather(*pendientes)
+
+    # --- Trabajos ---
+    async def _despachar(self):
+        while True:
+            id_interno, id_trabajo, peticion, notificar = await self._cola.get()
+            try:
+                await self._ejecutar(id_interno, id_trabajo, peticion, notificar)
+            except Exception as e:
+                self.fallidos += 1
+                notificar({'id': id_trabajo, 'evento': 'error', 'mensaje': f"{type(e).__name__}: {e}"})
+            finally:
+                self._activos.pop(id_interno, None)
+                self._cola.task_done()
+
+    async def _ejecutar(self, id_interno, id_trabajo, peticion, notificar):
+        instancia, en_cache = await self._obtener_instancia(peticion)
+        try:
+            self._activos[id_interno] = (id_trabajo, notificar)
+            notificar({'id': id_trabajo, 'evento': 'iniciado', 'instancia': instancia.id_instancia,
+                       'instancia_en_cache': en_cache})
+            semilla = peticion.get("semilla")
+            semilla = semilla if semilla is not None else random.randrange(2**32)
+            tiempo_limite = peticion.get("tiempo_limite")
+            tiempo_limite = float(tiempo_limite if tiempo_limite is not None else self.tiempo_limite)
+            resultado = await self._loop.run_in_executor(
+                self._pool, _resolver, id_interno, instancia.datos, instancia.shm.name, instancia.forma,
+                instancia.id_instancia, tiempo_limite, semilla, peticion.get("parametros", {}),
+                self.intervalo_progreso)
+        finally:
+            instancia.en_uso -= 1
+            self._recortar()
+        self.completados += 1
+        notificar({'id': id_trabajo, 'evento': 'resultado', 'semilla': semilla, **resultado})
+
+    async def _obtener_instancia(self, peticion):
+        """
+        (instancia, estaba_en_cache), ya marcada en uso. Cargas simultáneas de la misma
+        clave se comparten.
+        """
+        clave = _clave(peticion)
+        instancia = self._instancias.get(clave)
+        if instancia is not None:
+            self._instancias.move_to_end(clave)
+            self.aciertos_instancia += 1
+            instancia.en_uso += 1
+            return instancia, True
+        if clave in self._cargando:
+            instancia = await asyncio.shield(self._cargando[clave])
+            self.aciertos_instancia += 1
+            instancia.en_uso += 1
+            return instancia, True
+        futuro = self._loop.create_future()
+        self._cargando[clave] = futuro
+        try:
+            origen = {k: peticion[k] for k in ("instancia", "datos", "algoritmo_dist") if k in peticion}
+            datos, m_dist, id_instancia = await self._loop.run_in_executor(self._pool, _cargar, origen)
+            instancia = _Instancia(datos, m_dist, id_instancia)
+        except Exception as e:
+            futuro.set_exception(e)
+            futuro.exception()  # marcada como recuperada aunque nadie más la espere
+            raise
+        finally:
+            del self._cargando[clave]
+        self.cargas_instancia += 1
+        instancia.en_uso += 1
+        self._instancias[clave] = instancia
+        futuro.set_result(instancia)
+        self._recortar()
+        return instancia, False
+
+    def _recortar(self):
+        """Descarta las instancias menos usadas que sobren y no tengan trabajos en curso."""
+        for clave in list(self._instancias):
+            if len(self._instancias) <= self.max_instancias:
+                break
+            if self._instancias[clave].en_uso == 0:
+                self._instancias.pop(clave).liberar()
+
+    def _leer_progreso(self):
+        """Hilo que pasa al bucle de eventos los mensajes de progreso de los trabajadores."""
+        while True:
+            mensaje = self._cola_progreso.get()
+            if mensaje is None:
+                return
+            self._loop.call_soon_threadsafe(self._notificar_progreso, *mensaje)
+
+    def _notificar_progreso(self, id_interno, iteracion, costo_mejor, tiempo):
+        activo = self._activos.get(id_interno)
+        if activo is not None:  # el resultado puede haber llegado antes
+            id_trabajo, notificar = activo
+            notificar({'id': id_trabajo, 'evento': 'progreso', 'iteracion': iteracion,
+                       'costo_mejor': costo_mejor, 'tiempo': tiempo})
+
+    def estadisticas(self):
+        return {
+            'procesos': self.n_procesos,
+            'en_cola': self._cola.qsize() if self._cola is not None else 0,
+            'en_curso': len(self._activos),
+            'completados': self.completados,
+            'fallidos': self.fallidos,
+            'instancias': len(self._instancias),
+            'aciertos_instancia': self.aciertos_instancia,
+            'cargas_instancia': self.cargas_instancia,
+        }
+
+    # --- Transportes ---
+    async def servir_socket(self, host=HOST, puerto=PUERTO):
+        """Atiende conexiones TCP; cada una puede enviar cualquier número de trabajos."""
+        async def conexion(lector, escritor):
+            try:
+                await self.atender(lector, _escritor_json(escritor.write))
+                await escritor.drain()
+            finally:
+                escritor.close()
+
+        return await asyncio.start_server(conexion, host, puerto)
+
+    async def servir_stdin(self):
+        """Lee peticiones de la entrada estándar y responde por la salida estándar hasta EOF."""
+        lector = asyncio.StreamReader()
+        await self._loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(lector), sys.stdin)
+        salida = sys.stdout.buffer
+
+        def escribir(linea):
+            salida.write(linea)
+            salida.flush()
+
+        await self.atender(lector, _escritor_json(escribir))
+
+
+def _escritor_json(escribir):
+    def notificar(mensaje):
+        escribir((json.dumps(mensaje, default=_json_numpy) + "\n").encode("utf-8"))
+    return notificar
+
+
+def _json_numpy(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"{type(valor).__name__} no es serializable")
+
+
+def _al_terminar(notificar, terminado):
+    """Envuelve notificar para resolver `terminado` con el mensaje final del trabajo."""
+    def envoltura(mensaje):
+        notificar(mensaje)
+        if mensaje['evento'] in ('resultado', 'error', 'estadisticas') and not terminado.done():
+            terminado.set_result(mensaje)
+    return envoltura
+
+
+# ---------------------------------------------------------------------------
+# Cliente
+# ---------------------------------------------------------------------------
+async def enviar_trabajos(trabajos, host=HOST, puerto=PUERTO, al_recibir=None):
+    """
+    Envía una lista de peticiones al servicio y espera sus resultados.
+    al_recibir(mensaje) se llama con cada respuesta, incluidas las de progreso.
+    Retorna {id: mensaje final (resultado o error)}.
+    """
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    escritor.writelines((json.dumps(t) + "\n").encode("utf-8") for t in trabajos)
+    await escritor.drain()
+    escritor.write_eof()
+    finales = {}
+    while True:
+        linea = await lector.readline()
+        if not linea:
+            break
+        mensaje = json.loads(linea)
+        if al_recibir is not None:
+            al_recibir(mensaje)
+        if mensaje['evento'] in ('resultado', 'error'):
+            finales[mensaje.get('id')] = mensaje
+    escritor.close()
+    await escritor.wait_closed()
+    return finales
+
+
+async def _principal(args):
+    async with ServicioCarp(args.procesos, args.max_instancias, args.max_pendientes,
+                            args.intervalo_progreso, args.tiempo_limite, args.backend) as servicio:
+        if args.stdin:
+            await servicio.servir_stdin()
+            return
+        servidor = await servicio.servir_socket(args.host, args.puerto)
+        print(f"Servicio CARP escuchando en {args.host}:{args.puerto}", file=sys.stderr)
+        async with servidor:
+            await servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servicio local de resolución CARP")
+    parser.add_argument("--stdin", action="store_true", help="líneas JSON por entrada/salida estándar")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--max-instancias", type=int, default=8)
+    parser.add_argument("--max-pendientes", type=int, default=1000)
+    parser.add_argument("--intervalo-progreso", type=float, default=1.0)
+    parser.add_argument("--tiempo-limite", type=float, default=10.0)
+    parser.add_argument("--backend", choices=backends_disponibles(), default=None,
+                        help="núcleo de evaluación de rutas (por defecto el más rápido)")
+    try:
+        asyncio.run(_principal(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
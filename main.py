@@ -12,6 +12,7 @@ Autor: Tesis CARP 2026
 import copy
 import os
 import re
+import time
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
@@ -30,6 +31,12 @@ import networkx as nx
 import carplib_metaheuristics.modelo as _carplib_mod
 importlib.reload(_carplib_mod)
 from carplib_metaheuristics.modelo import CarpLib
+from carplib_metaheuristics.recocido import RecocidoSimulado
+from carplib_metaheuristics.evaluacion import depositos_de
+
+# El recocido de la GUI corre en tramos cortos entre eventos de Tk para no congelar la ventana
+MAX_SEGUNDOS_RECOCIDO = 120
+TRAMO_RECOCIDO = 0.05  # segundos de búsqueda por tramo
 
 
 class CarpGUI(tk.Tk):
@@ -53,6 +60,8 @@ class CarpGUI(tk.Tk):
 
         # Solución actual (pre procesamiento)
         self.solucion_actual = None
+        # Recocido en curso: (sa, solución original, instancia, instante de fin) o None
+        self._recocido = None
 
         # Componentes principales
         self._crear_componentes()
@@ -191,9 +200,18 @@ class CarpGUI(tk.Tk):
 
         # --- Solución inicial (TAREA 3) ---
         ttk.Label(ctrl_frame, text="Solución inicial:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
+        self.metodo_inicial_var = tk.StringVar(value="aleatoria")
+        cbo_metodo = ttk.Combobox(
+            ctrl_frame,
+            textvariable=self.metodo_inicial_var,
+            state="readonly",
+            values=["aleatoria", "path_scanning", "augment_merge", "grasp"],
+            width=14,
+        )
+        cbo_metodo.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
         ttk.Button(
             ctrl_frame, text="Generar solución inicial", command=self._on_generar_solucion_inicial
-        ).grid(row=0, column=1, padx=5, pady=5)
+        ).grid(row=0, column=2, padx=5, pady=5, sticky=tk.W)
 
         # --- Operadores (TAREA 4) ---
         ttk.Label(ctrl_frame, text="Operador:").grid(row=1, column=0, padx=5, pady=5, sticky=tk.W)
@@ -224,6 +242,36 @@ class CarpGUI(tk.Tk):
             ctrl_frame, text="Aplicar mutación", command=self._on_aplicar_mutacion
         ).grid(row=3, column=1, padx=5, pady=5, sticky=tk.W)
 
+        # --- Búsqueda local (TAREA 5) ---
+        ttk.Label(ctrl_frame, text="Búsqueda local:").grid(row=4, column=0, padx=5, pady=5, sticky=tk.W)
+        self.estrategia_var = tk.StringVar(value="best")
+        cbo_est = ttk.Combobox(
+            ctrl_frame,
+            textvariable=self.estrategia_var,
+            state="readonly",
+            values=["best", "first"],
+            width=12,
+        )
+        cbo_est.grid(row=4, column=1, padx=5, pady=5, sticky=tk.W)
+        ttk.Button(
+            ctrl_frame, text="Aplicar búsqueda local", command=self._on_aplicar_busqueda_local
+        ).grid(row=4, column=2, padx=5, pady=5, sticky=tk.W)
+
+        # --- Recocido simulado con selección de operadores ---
+        ttk.Label(ctrl_frame, text="Recocido (s):").grid(row=5, column=0, padx=5, pady=5, sticky=tk.W)
+        self.tiempo_sa_var = tk.StringVar(value="5")
+        tk.Spinbox(
+            ctrl_frame, from_=1, to=MAX_SEGUNDOS_RECOCIDO, increment=1, textvariable=self.tiempo_sa_var, width=6
+        ).grid(row=5, column=1, padx=5, pady=5, sticky=tk.W)
+        self.adaptativo_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            ctrl_frame, text="Operadores adaptativos", variable=self.adaptativo_var
+        ).grid(row=5, column=2, padx=5, pady=5, sticky=tk.W)
+        self.btn_recocido = ttk.Button(
+            ctrl_frame, text="Aplicar recocido simulado", command=self._on_aplicar_recocido
+        )
+        self.btn_recocido.grid(row=5, column=3, padx=5, pady=5, sticky=tk.W)
+
         # --- Área de resultado: solución actual, costo, factibilidad ---
         res_frame = ttk.LabelFrame(self.tab_prepro, text="Solución actual")
         res_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -360,7 +408,8 @@ class CarpGUI(tk.Tk):
             )
             return
         try:
-            self.solucion_actual = self.carp.generar_solucion_inicial()
+            metodo = self.metodo_inicial_var.get() or "aleatoria"
+            self.solucion_actual = self.carp.generar_solucion_inicial(metodo)
             self._actualizar_solucion_display(explicacion_inicial=True)
             messagebox.showinfo("Solución inicial", "Solución inicial generada correctamente.")
         except Exception as e:
@@ -383,6 +432,81 @@ class CarpGUI(tk.Tk):
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def _on_aplicar_busqueda_local(self):
+        """Aplica la búsqueda local (TAREA 5) hasta un óptimo local y muestra solución original y mejorada."""
+        if self.solucion_actual is None:
+            messagebox.showwarning("Sin solución", "Genera primero una solución inicial.")
+            return
+        try:
+            estrategia = self.estrategia_var.get() or "best"
+            original = copy.deepcopy(self.solucion_actual)
+            nueva, costo = self.carp.busqueda_local(self.solucion_actual, estrategia=estrategia)
+            self.solucion_actual = nueva
+            self._actualizar_solucion_display(solucion_original=original, solucion_mutada=nueva)
+            messagebox.showinfo("Búsqueda local", f"Óptimo local alcanzado ({estrategia}). Costo: {costo}")
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def _on_aplicar_recocido(self):
+        """
+        Recocido simulado desde la solución actual. Con operadores adaptativos, la operación
+        y P(inter-ruta) los elige el selector y se muestran sus estadísticas por operador.
+        La búsqueda avanza en tramos de TRAMO_RECOCIDO segundos programados con after(),
+        de modo que la ventana sigue respondiendo mientras dura.
+        """
+        if self.solucion_actual is None:
+            messagebox.showwarning("Sin solución", "Genera primero una solución inicial.")
+            return
+        if self._recocido is not None:
+            return
+        try:
+            segundos = float(self.tiempo_sa_var.get().strip())
+            segundos = max(1.0, min(float(MAX_SEGUNDOS_RECOCIDO), segundos))
+            p_inter = max(0.0, min(1.0, float(self.p_inter_var.get().strip())))
+            original = copy.deepcopy(self.solucion_actual)
+            sa = RecocidoSimulado(self.carp, p_inter=p_inter, adaptativo=self.adaptativo_var.get())
+            sa.iniciar(self.solucion_actual)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self._recocido = (sa, original, self.carp.datos, time.perf_counter() + segundos)
+        self.btn_recocido.configure(text="Recocido en curso...", state=tk.DISABLED)
+        self.after(1, self._tramo_recocido)
+
+    def _tramo_recocido(self):
+        """Un tramo de iteraciones del recocido en curso; al agotar el tiempo, lo termina."""
+        sa, original, datos, fin = self._recocido
+        try:
+            if self.carp.datos is not datos:
+                # Se cargó otra instancia durante la búsqueda: se descarta
+                self._fin_recocido()
+                return
+            restante = fin - time.perf_counter()
+            if restante > 0:
+                sa.iterar(tiempo_limite=min(TRAMO_RECOCIDO, restante))
+                self.after(1, self._tramo_recocido)
+                return
+            if sa.busqueda_local:
+                sa.aceptar_externa(*self.carp.busqueda_local(sa.mejor))
+            self._fin_recocido()
+            nueva, costo = sa.mejor, sa.costo_mejor
+            self.solucion_actual = nueva
+            self._actualizar_solucion_display(solucion_original=original, solucion_mutada=nueva)
+            if sa.selector is not None:
+                tabla = pd.DataFrame(sa.selector.estadisticas()).set_index("operador")
+                self.txt_solucion.configure(state=tk.NORMAL)
+                self.txt_solucion.insert(tk.END, "\n\n--- Operadores (selección adaptativa) ---\n")
+                self.txt_solucion.insert(tk.END, tabla.round(3).to_string())
+                self.txt_solucion.configure(state=tk.DISABLED)
+            messagebox.showinfo("Recocido simulado", f"{sa.iteracion} iteraciones. Mejor costo: {costo}")
+        except Exception as e:
+            self._fin_recocido()
+            messagebox.showerror("Error", str(e))
+
+    def _fin_recocido(self):
+        self._recocido = None
+        self.btn_recocido.configure(text="Aplicar recocido simulado", state=tk.NORMAL)
+
     @staticmethod
     def _crear_texto_matriz(parent):
         frame = ttk.Frame(parent)
@@ -511,13 +635,13 @@ class CarpGUI(tk.Tk):
             nodos_req.add(u)
             nodos_req.add(v)
 
-        deposito = None
+        depositos = set()
         if self.carp.datos:
-            deposito = self.carp.datos.get("DEPOSITO", None)
+            depositos = set(depositos_de(self.carp.datos))
 
         node_colors = []
         for n in self.carp.G.nodes():
-            if deposito is not None and n == deposito:
+            if n in depositos:
                 node_colors.append("blue")
             elif n in nodos_req:
                 node_colors.append("green")
@@ -674,35 +798,30 @@ class CarpGUI(tk.Tk):
 
     def _generar_analisis_grafo(self):
         """
-        Genera un texto con el análisis del grafo usando NetworkX.
+        Genera un texto con el análisis del grafo calculado al cargar la instancia
+        (CarpLib.analisis), sin recalcular la conectividad en cada redibujado.
         Retorna un string formateado para mostrar en el gráfico.
         """
-        if self.carp.G is None or self.carp.datos is None:
+        if self.carp.analisis is None or self.carp.datos is None:
             return "Análisis no disponible"
 
-        G = self.carp.G
+        analisis = self.carp.analisis
         datos = self.carp.datos
         lineas = []
 
         # Tipo de grafo
-        es_dirigido = G.is_directed()
-        lineas.append(f"Tipo de grafo: {'Dirigido' if es_dirigido else 'No dirigido'}")
+        lineas.append("Tipo de grafo: No dirigido")
 
         # Número de nodos y aristas
-        n_nodos = G.number_of_nodes()
-        n_aristas = G.number_of_edges()
-        lineas.append(f"Número de nodos: {n_nodos}")
-        lineas.append(f"Número de aristas: {n_aristas}")
+        lineas.append(f"Número de nodos: {analisis['n_nodos']}")
+        lineas.append(f"Número de aristas: {analisis['n_aristas']}")
+        lineas.append(
+            f"Grado min/medio/max: {analisis['grado_min']}/"
+            f"{analisis['grado_medio']:.2f}/{analisis['grado_max']}"
+        )
 
         # Conectividad global
-        try:
-            if not es_dirigido:
-                conexo = nx.is_connected(G)
-            else:
-                conexo = nx.is_strongly_connected(G)
-        except Exception:
-            conexo = False
-
+        conexo = analisis["es_conexo"]
         lineas.append(f"¿Es conexo?: {'Sí' if conexo else 'No'}")
         if conexo:
             lineas.append("  Significa: existe un camino entre")
@@ -710,20 +829,17 @@ class CarpGUI(tk.Tk):
         else:
             lineas.append("  Significa: hay nodos aislados")
             lineas.append("  o componentes desconectadas")
+            lineas.append(f"  Componentes: {analisis['n_componentes']}")
 
         # Depósito y nodos alcanzables
         deposito = datos.get("DEPOSITO", None)
-        if deposito is not None and deposito in G.nodes:
-            lineas.append(f"\nDepósito: nodo {deposito}")
-            try:
-                if not es_dirigido:
-                    comp_dep = nx.node_connected_component(G, deposito)
-                else:
-                    comp_dep = nx.node_connected_component(G.to_undirected(), deposito)
-            except Exception:
-                comp_dep = set()
-
-            nodos_no_alcanzables = sorted(set(G.nodes()) - set(comp_dep))
+        if deposito is not None and 1 <= deposito <= analisis["n_nodos"]:
+            depositos = depositos_de(datos)
+            if len(depositos) > 1:
+                lineas.append(f"\nDepósitos: nodos {', '.join(map(str, depositos))}")
+            else:
+                lineas.append(f"\nDepósito: nodo {deposito}")
+            nodos_no_alcanzables = (np.flatnonzero(~analisis["nodos_alcanzables"]) + 1).tolist()
             if nodos_no_alcanzables:
                 lineas.append(f"¿Nodos alcanzables?: No")
                 if len(nodos_no_alcanzables) <= 10:
@@ -735,16 +851,10 @@ class CarpGUI(tk.Tk):
                 lineas.append("  Todos los nodos son alcanzables")
 
             # Arcos requeridos alcanzables desde el depósito
-            lista_req = datos.get("LISTA_ARISTAS_REQ", [])
-            arcos_no_alcanzables = []
-            for item in lista_req:
-                u, v = item["arco"]
-                if u not in comp_dep and v not in comp_dep:
-                    arcos_no_alcanzables.append((u, v))
-
-            if arcos_no_alcanzables:
+            n_no_alcanzables = int((~analisis["tareas_alcanzables"]).sum())
+            if n_no_alcanzables:
                 lineas.append(f"\n¿Arcos requeridos alcanzables?: No")
-                lineas.append(f"  {len(arcos_no_alcanzables)} arcos no pueden llegar al depósito")
+                lineas.append(f"  {n_no_alcanzables} arcos no pueden llegar al depósito")
             else:
                 lineas.append(f"\n¿Arcos requeridos alcanzables?: Sí")
                 lineas.append("  Todos los arcos requeridos pueden llegar al depósito")
@@ -0,0 +1,145 @@
+"""
+Garantías de equivalencia en las que se apoya el resto del código:
+ - los backends "python" y "numba" de EvaluadorRutas dan exactamente el mismo resultado,
+   con uno o varios depósitos y con tareas inalcanzables;
+ - una corrida de RecocidoSimulado reanudada desde un punto de control es idéntica
+   a la corrida sin interrumpir;
+ - el análisis vectorizado de componentes de CarpLib.analizar_grafo coincide con networkx.
+"""
+
+import contextlib
+import io
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from carplib_metaheuristics import (CarpLib, EvaluadorRutas, RecocidoSimulado, SelectorOperadores,
+                                    backends_disponibles, generar_instancia)
+
+con_numba = pytest.mark.skipif("numba" not in backends_disponibles(), reason="numba no está instalado")
+
+
+def _carp(datos):
+    """CarpLib con grafo, matriz de distancias y análisis a partir de datos ya en memoria."""
+    c = CarpLib()
+    c.datos = datos
+    with contextlib.redirect_stdout(io.StringIO()):
+        c.construir_grafo()
+        c.generar_matriz_distancias("dijkstra")
+    c.analizar_grafo()
+    return c
+
+
+def _desconectada(datos):
+    """Añade una componente de dos vértices con una tarea y un vértice aislado."""
+    n = datos['VERTICES']
+    datos['VERTICES'] = n + 3
+    datos['LISTA_ARISTAS_REQ'].append({'arco': (n + 1, n + 2), 'coste': 5, 'demanda': 1})
+    datos['ARISTAS_REQ'] = len(datos['LISTA_ARISTAS_REQ'])
+    return datos
+
+
+def _rutas_aleatorias(n_tareas, rng, n_rutas=40):
+    rutas = [[]]
+    for _ in range(n_rutas):
+        rutas.append(rng.sample(range(1, n_tareas + 1), rng.randint(1, min(15, n_tareas))))
+    return rutas
+
+
+@pytest.fixture(scope="module")
+def instancias():
+    return {
+        'calles': _carp(generar_instancia("calles", 60, semilla=11)),
+        'geometrico': _carp(generar_instancia("geometrico", 50, semilla=12)),
+        'desconectada': _carp(_desconectada(generar_instancia("calles", 40, semilla=13))),
+    }
+
+
+@con_numba
+@pytest.mark.parametrize("nombre", ["calles", "geometrico", "desconectada"])
+@pytest.mark.parametrize("varios_depositos", [False, True])
+def test_backends_identicos(instancias, nombre, varios_depositos):
+    c = instancias[nombre]
+    datos = dict(c.datos)
+    if varios_depositos:
+        datos['DEPOSITOS'] = [datos['DEPOSITO'], 1, c.datos['VERTICES']]
+    python = EvaluadorRutas(datos, c.m_dist, "python")
+    numba = EvaluadorRutas(datos, c.m_dist, "numba")
+    rutas = _rutas_aleatorias(len(datos['LISTA_ARISTAS_REQ']), random.Random(5))
+    if nombre == "desconectada":
+        # La última tarea está en la componente sin depósito
+        rutas += [[len(datos['LISTA_ARISTAS_REQ'])], [1, len(datos['LISTA_ARISTAS_REQ']), 2]]
+
+    esperados = [python.recorrer(r) for r in rutas]
+    assert [numba.recorrer(r) for r in rutas] == esperados
+    assert numba.recorrer_varias(rutas) == esperados
+    assert python.recorrer_varias(rutas) == esperados
+    if nombre == "desconectada":
+        assert esperados[-1][0] == float('inf')
+
+
+def _estado(sa):
+    return (sa.mejor, sa.costo_mejor, sa.actual, sa.costo_actual, sa.temperatura, sa.lambda_,
+            random.getstate())
+
+
+@pytest.mark.parametrize("adaptativo", [False, True])
+def test_reanudar_identico(tmp_path, adaptativo):
+    ruta = tmp_path / "punto_control.bin"
+
+    def nuevo():
+        c = _carp(generar_instancia("calles", 40, semilla=21))
+        c.configurar_flota(flota_abierta=True)
+        selector = SelectorOperadores(por_tiempo=False) if adaptativo else None
+        return RecocidoSimulado(c, penalizacion=True, busqueda_local=False, metodo_inicial="path_scanning",
+                                adaptativo=adaptativo, selector=selector)
+
+    random.seed(7)
+    sa = nuevo()
+    sa.iniciar()
+    sa.iterar(max_iter=1500)
+    sa.guardar_punto_control(ruta)
+    sa.iterar(max_iter=3000)
+    referencia = _estado(sa)
+
+    # Misma corrida interrumpida después del punto de control
+    random.seed(7)
+    sa = nuevo()
+    sa.iniciar()
+    sa.iterar(max_iter=1500)
+    sa.guardar_punto_control(ruta)
+    sa.iterar(max_iter=2100)
+
+    random.seed(999)
+    sa = nuevo()
+    sa.reanudar(ruta)
+    sa.iterar(max_iter=3000)
+    assert sa.iteracion == 4500
+    assert _estado(sa) == referencia
+
+
+@pytest.mark.parametrize("tipo, semilla, desconectar", [
+    ("calles", 31, False), ("geometrico", 32, False), ("grid", 33, True), ("geometrico", 34, True),
+])
+def test_conectividad_como_networkx(tipo, semilla, desconectar):
+    datos = generar_instancia(tipo, 50, semilla=semilla)
+    c = _carp(_desconectada(datos) if desconectar else datos)
+    a = c.analisis
+    componentes = list(nx.connected_components(c.G))
+
+    assert a['n_componentes'] == len(componentes)
+    assert a['es_conexo'] == nx.is_connected(c.G)
+    assert a['tam_componentes'].tolist() == sorted(map(len, componentes), reverse=True)
+    # Dos vértices comparten etiqueta si y solo si están en la misma componente
+    etiquetas = a['etiquetas']
+    for comp in componentes:
+        assert len({etiquetas[v - 1] for v in comp}) == 1
+    assert len({etiquetas[next(iter(comp)) - 1] for comp in componentes}) == len(componentes)
+    assert a['grados'].tolist() == [c.G.degree(v) for v in range(1, c.datos['VERTICES'] + 1)]
+
+    alcanzables = nx.node_connected_component(c.G, c.datos['DEPOSITO'])
+    assert np.flatnonzero(a['nodos_alcanzables']).tolist() == sorted(v - 1 for v in alcanzables)
+    assert c.alcanzables == [t for t, it in enumerate(c.datos['LISTA_ARISTAS_REQ'], 1)
+                             if it['arco'][0] in alcanzables]